@@ -0,0 +1,40 @@
+import argparse
+import os
+
+from chessgame import display
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="pack the piece images into one file the game loads instead"
+    )
+    parser.add_argument(
+        "--cell-size",
+        type=int,
+        default=256,
+        help="pixels per piece, larger tiles scale the pieces up",
+    )
+    parser.add_argument(
+        "--output", default=os.path.join(display.ASSETS_DIR, display.ATLAS_FILE)
+    )
+    parser.add_argument(
+        "--remove", action="store_true", help="go back to the separate piece files"
+    )
+    args = parser.parse_args()
+
+    if args.remove:
+        os.remove(args.output)
+        return
+    # images are converted for a display, a hidden one is enough
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    display.write_atlas(args.output, args.cell_size)
+    print(f"wrote {args.output} ({os.path.getsize(args.output) / 1000:.0f} kB)")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+import argparse
+import cProfile
+import linecache
+import os
+import pickle
+import pstats
+import random
+import tempfile
+import tracemalloc
+from copy import deepcopy
+from time import perf_counter
+from typing import Callable
+
+from chessgame import bitboard, pgn
+from chessgame.board import PROMOTION_TYPES, START_FEN, Board, get_default_board
+from chessgame.engine import Engine
+from chessgame.instrument import ENGINE_PATHS, GAME_PATHS, HOT_PATHS, Registry
+from chessgame.perft import POSITIONS, perft
+from chessgame.piece import PieceColor
+
+
+def time_per_call(function: Callable[[], object], count: int) -> float:
+    start = perf_counter()
+    for _ in range(count):
+        function()
+    return (perf_counter() - start) / count
+
+
+def print_frame_times(name: str, samples: list[float]):
+    from chessgame.profiler import percentile  # the profiler imports pygame
+
+    print(
+        f"{name:<24} mean {sum(samples) / len(samples) * 1000:6.2f}ms "
+        f"p50 {percentile(samples, 0.5) * 1000:6.2f}ms "
+        f"p95 {percentile(samples, 0.95) * 1000:6.2f}ms "
+        f"max {max(samples) * 1000:6.2f}ms"
+    )
+
+
+def run_memory(count: int):
+    fens = [position.fen for position in POSITIONS]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    boards = [Board.from_fen(fens[i % len(fens)]) for i in range(count)]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{size / len(boards):8.0f} bytes per position ({count} positions)")
+
+    fresh = boards[1]
+    del boards  # so the collector does not walk them while timing
+    # a board from the game has its pieces built and a history to carry over
+    played = Board.from_fen(fens[1])
+    played.tiles
+    rng = random.Random(count)
+    for _ in range(20):
+        moves = played.legal_moves()
+        if not moves:
+            break
+        played.make_move(rng.choice(moves))
+    for label, board in (("fen", fresh), ("played", played)):
+        for name, clone in (
+            ("copy", board.copy),
+            ("deepcopy", lambda: deepcopy(board)),
+            ("pickle", lambda: pickle.loads(pickle.dumps(board))),
+        ):
+            seconds = time_per_call(clone, max(count // 10, 1))
+            print(f"{label:<6} {name:<10} {seconds * 1e6:8.1f} us per clone")
+
+
+def write_random_games(path: str, count: int, max_plies: int = 200):
+    rng = random.Random(count)
+    with open(path, "w") as file:
+        for round_number in range(1, count + 1):
+            board = get_default_board()
+            for _ in range(max_plies):
+                moves = board.legal_moves()
+                if not moves:
+                    break
+                board.make_move(rng.choice(moves))
+            result = "*"
+            if not board.legal_moves():
+                result = "1/2-1/2"
+                if board.is_in_check():
+                    result = "0-1" if board.turn == PieceColor.WHITE else "1-0"
+            headers = {"Event": "Random Game", "Round": str(round_number)}
+            pgn.write_game(file, pgn.game_from_board(board, headers, result))
+
+
+def run_replay(path: str):
+    games = 0
+    positions = 0
+    start = perf_counter()
+    with open(path) as file:
+        for game in pgn.read_games(file):
+            pgn.replay_game(game)
+            games += 1
+            positions += len(game.moves) + 1
+    seconds = perf_counter() - start
+    megabytes = os.path.getsize(path) / 1e6
+    print(
+        f"{games} games {positions} positions {megabytes:.1f} MB in {seconds:.2f}s: "
+        f"{games / seconds:.1f} games/s {positions / seconds:.0f} positions/s"
+    )
+
+
+def run_frames(frames: int, width: int, height: int):
+    # only this benchmark needs a window, the dummy driver works without a screen
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+
+    from chessgame import background, display
+
+    pygame.init()
+    screen = pygame.display.set_mode((width, height))
+    board = get_default_board()
+    images = display.get_image_dict()
+
+    def scale_every_frame(pos_and_size: tuple[int, int, int, int]):
+        left, top, tile_width, tile_height = pos_and_size
+        for row in board.tiles:
+            for piece in row:
+                if piece is not None:
+                    sprite = pygame.transform.scale(
+                        images[(piece.color, piece.piece_type)],
+                        (tile_width, tile_height),
+                    )
+                    position = (
+                        left + piece.pos_x * tile_width,
+                        top + piece.pos_y * tile_height,
+                    )
+                    screen.blit(sprite, position)
+
+    def draw_rects(highlights: set[tuple[int, int]]) -> tuple[int, int, int, int]:
+        pos_and_size = background.get_layout(width, height)
+        left, top, tile_width, tile_height = pos_and_size
+        for y in range(8):
+            for x in range(8):
+                color = (
+                    background.LIGHT_BROWN
+                    if (x + y) % 2 == 0
+                    else background.DARK_BROWN
+                )
+                if (x, y) in highlights:
+                    color = color.lerp(background.GREEN, background.MOVE_HIGHLIGHT)
+                pygame.draw.rect(
+                    screen,
+                    color,
+                    (
+                        left + tile_width * x,
+                        top + tile_height * y,
+                        tile_width,
+                        tile_height,
+                    ),
+                )
+        return pos_and_size
+
+    sprites = display.SpriteCache(images)
+    smooth_sprites = display.SpriteCache(images, smooth=True)
+
+    def draw_sprites(pos_and_size: tuple[int, int, int, int]):
+        display.render_pieces(screen, board.tiles, pos_and_size, sprites)
+
+    def draw_smooth_sprites(pos_and_size: tuple[int, int, int, int]):
+        display.render_pieces(screen, board.tiles, pos_and_size, smooth_sprites)
+
+    checkerboard = background.Checkerboard()
+    # about what a queen in the middle of the board lights up
+    highlights = {(x, 4) for x in range(8)} | {(3, y) for y in range(8)}
+    for name, draw_board, draw_pieces in (
+        ("64 rects, scaling", draw_rects, scale_every_frame),
+        ("64 rects, sprites", draw_rects, draw_sprites),
+        (
+            "board surface, sprites",
+            lambda moves: checkerboard.draw(screen, moves),
+            draw_sprites,
+        ),
+        (
+            "board surface, smooth",
+            lambda moves: checkerboard.draw(screen, moves),
+            draw_smooth_sprites,
+        ),
+    ):
+        samples = []
+        for _ in range(frames):
+            start = perf_counter()
+            screen.fill((0, 0, 0))
+            draw_pieces(draw_board(highlights))
+            pygame.display.update()
+            samples.append(perf_counter() - start)
+        print_frame_times(name, samples)
+    pygame.quit()
+
+
+def run_assets(width: int, height: int, cell_size: int, repeat: int):
+    start = perf_counter()
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+
+    from chessgame import display, scene
+
+    steps = [("import", perf_counter())]
+    pygame.init()
+    screen = pygame.display.set_mode((width, height))
+    steps.append(("open window", perf_counter()))
+    scene.MenuScene().on_loop(screen, 0)
+    steps.append(("draw menu", perf_counter()))
+    scene.GameScene().on_loop(screen, 0)
+    steps.append(("first game", perf_counter()))
+    scene.GameScene().on_loop(screen, 0)
+    steps.append(("new game", perf_counter()))
+    for name, end in steps:
+        print(f"{name:<12} {(end - start) * 1000:8.1f} ms")
+        start = end
+
+    with tempfile.TemporaryDirectory() as directory:
+        display.write_atlas(os.path.join(directory, display.ATLAS_FILE), cell_size)
+        for name, source in (
+            ("piece files", display.ASSETS_DIR),
+            (f"atlas {cell_size}px", directory),
+        ):
+            seconds = time_per_call(lambda: display.load_piece_images(source), repeat)
+            print(f"load {name:<14} {seconds * 1000:8.1f} ms")
+    pygame.quit()
+
+
+def get_script(fen: str, pgn_path: str | None, plies: int, seed: int):
+    board = Board.from_fen(fen)
+    if pgn_path is not None:
+        with open(pgn_path) as file:
+            game = next(pgn.read_games(file))
+        board = pgn.start_board(game)
+        moves = []
+        for san in game.moves:
+            moves.append(pgn.parse_san(board, san))
+            board.make_move(moves[-1])
+        return pgn.start_board(game), moves
+    rng = random.Random(seed)
+    moves = []
+    for _ in range(plies):
+        legal_moves = board.legal_moves()
+        if not legal_moves:
+            break
+        moves.append(rng.choice(legal_moves))
+        board.make_move(moves[-1])
+    return Board.from_fen(fen), moves
+
+
+def play_script(board: Board, moves: list[bitboard.Move]) -> Board:
+    # the rules GameScene runs for every move a player makes, without a window
+    from chessgame import scene
+
+    legal_moves = scene.get_legal_move_map(board, board.turn)
+    for from_sq, to, promotion in moves:
+        x1, y1 = bitboard.coords(from_sq)
+        x2, y2 = bitboard.coords(to)
+        assert (x2, y2) in legal_moves[(x1, y1)]
+        board.move_piece(x1, y1, x2, y2)
+        if board.promoted_piece is not None:
+            assert promotion is not None
+            board.promote(PROMOTION_TYPES[promotion])
+        legal_moves = scene.get_legal_move_map(board, board.turn)
+        if not legal_moves:
+            scene.get_winner(board, board.turn)
+        else:
+            board.get_draw_reason()
+    return board
+
+
+def run_rules(args: argparse.Namespace):
+    targets = HOT_PATHS
+    if args.workload == "perft":
+        board = Board.from_fen(args.fen)
+        actions = 1
+        workload: Callable[[], object] = lambda: perft(board, args.depth)
+    elif args.workload == "search":
+        board = Board.from_fen(args.fen)
+        actions = 1
+        workload = lambda: Engine().search(board, args.depth)
+        targets += ENGINE_PATHS
+    else:
+        from chessgame import scene  # imported up front, not while profiling
+
+        board, moves = get_script(args.fen, args.pgn, args.plies, args.seed)
+        actions = len(moves)
+        workload = lambda: play_script(board, moves)
+        targets += GAME_PATHS
+
+    if args.profiler == "counters":
+        with Registry(targets) as registry:
+            workload()
+        print(f"{actions} actions ({args.workload})")
+        for line in registry.get_lines(actions):
+            print(line)
+    elif args.profiler == "cprofile":
+        profile = cProfile.Profile()
+        profile.runcall(workload)
+        pstats.Stats(profile).sort_stats("cumulative").print_stats(args.top)
+    else:
+        tracemalloc.start(args.frames)
+        result = workload()  # what it returns stays alive for the snapshot
+        snapshot = tracemalloc.take_snapshot()
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        print(f"{size / 1000:.0f} kB kept by the result, {peak / 1000:.0f} kB peak")
+        for stat in snapshot.statistics("traceback")[: args.top]:
+            frame = stat.traceback[0]
+            line = linecache.getline(frame.filename, frame.lineno).strip()
+            print(
+                f"{stat.size / 1000:8.1f} kB {stat.count:7} blocks "
+                f"{os.path.relpath(frame.filename)}:{frame.lineno} {line}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="measure the game without a window")
+    commands = parser.add_subparsers(dest="command", required=True)
+    memory = commands.add_parser("memory", help="board size and clone cost")
+    memory.add_argument("--positions", type=int, default=10000)
+    replay = commands.add_parser("replay", help="check every move of a PGN file")
+    replay.add_argument("path")
+    replay.add_argument(
+        "--random-games",
+        type=int,
+        default=0,
+        help="first overwrite the file with this many random games",
+    )
+    frames = commands.add_parser("frames", help="time drawing the board")
+    frames.add_argument("--frames", type=int, default=300)
+    frames.add_argument("--width", type=int, default=1280)
+    frames.add_argument("--height", type=int, default=720)
+    assets = commands.add_parser("assets", help="time startup and a new game")
+    assets.add_argument("--width", type=int, default=1280)
+    assets.add_argument("--height", type=int, default=720)
+    assets.add_argument("--atlas-size", type=int, default=256)
+    assets.add_argument("--repeat", type=int, default=5)
+    rules = commands.add_parser(
+        "rules", help="count or profile the rules code a game, perft or search runs"
+    )
+    rules.add_argument("workload", choices=("game", "perft", "search"))
+    rules.add_argument(
+        "--profiler",
+        choices=("counters", "cprofile", "tracemalloc"),
+        default="counters",
+    )
+    rules.add_argument("--fen", default=START_FEN)
+    rules.add_argument("--depth", type=int, default=3, help="perft or search depth")
+    rules.add_argument(
+        "--pgn", help="play the first game of this file instead of random moves"
+    )
+    rules.add_argument("--plies", type=int, default=80, help="random game length")
+    rules.add_argument("--seed", type=int, default=0)
+    rules.add_argument("--top", type=int, default=20, help="rows to print")
+    rules.add_argument(
+        "--frames", type=int, default=1, help="stack frames tracemalloc keeps"
+    )
+    args = parser.parse_args()
+
+    if args.command == "memory":
+        run_memory(args.positions)
+    elif args.command == "replay":
+        if args.random_games:
+            write_random_games(args.path, args.random_games)
+        run_replay(args.path)
+    elif args.command == "frames":
+        run_frames(args.frames, args.width, args.height)
+    elif args.command == "assets":
+        run_assets(args.width, args.height, args.atlas_size, args.repeat)
+    elif args.command == "rules":
+        run_rules(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+from time import perf_counter
+
+from chessgame import pgn
+from chessgame.board import START_FEN, Board
+from chessgame.book import (
+    BOOK_PLIES,
+    DEFAULT_BOOK,
+    OpeningBook,
+    collect_moves,
+    write_book,
+)
+
+
+def run_build(paths: list[str], output: str, plies: int):
+    start = perf_counter()
+    games = 0
+
+    def read_all():
+        nonlocal games
+        for path in paths:
+            with open(path) as file:
+                for game in pgn.read_games(file):
+                    games += 1
+                    yield game
+
+    weights = collect_moves(read_all(), plies)
+    records = write_book(output, weights)
+    print(
+        f"{games} games {len(weights)} positions {records} moves "
+        f"in {perf_counter() - start:.1f}s, wrote {output}"
+    )
+
+
+def run_probe(path: str, fen: str, repeat: int):
+    start = perf_counter()
+    book = OpeningBook(path)
+    opened = perf_counter() - start
+    board = Board.from_fen(fen)
+    start = perf_counter()
+    for _ in range(repeat):
+        moves = book.get_moves(board.hash)
+    lookup = (perf_counter() - start) / repeat
+    print(
+        f"{book.count} moves in the book, opened in {opened * 1e6:.0f} us, "
+        f"lookup {lookup * 1e6:.1f} us"
+    )
+    total = sum(book_move.weight for book_move in moves) or 1
+    for move, weight in moves:
+        print(f"{pgn.move_to_san(board, move):<8} {weight:>6} {weight / total:6.1%}")
+    book.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="make or read an opening book")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile PGN files into a book")
+    build.add_argument("paths", nargs="+")
+    build.add_argument("--output", default=DEFAULT_BOOK)
+    build.add_argument(
+        "--plies", type=int, default=BOOK_PLIES, help="moves per game to keep"
+    )
+    probe = commands.add_parser("probe", help="list the book moves of a position")
+    probe.add_argument("--book", default=DEFAULT_BOOK)
+    probe.add_argument("--fen", default=START_FEN)
+    probe.add_argument("--repeat", type=int, default=10000)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        run_build(args.paths, args.output, args.plies)
+    else:
+        run_probe(args.book, args.fen, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +0,0 @@
-from chessgame import background, display, game, scene
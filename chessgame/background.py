@@ -1,3 +1,5 @@
+from typing import Iterable
+
 import pygame
 
 # board goes from A to H columns and 1 to 8 rows (8*8)
@@ -5,73 +7,92 @@ import pygame
 LIGHT_BROWN = pygame.Color(232, 221, 176)
 DARK_BROWN = pygame.Color(170, 141, 94)
 GREEN = pygame.Color(15, 157, 88)
+MOVE_HIGHLIGHT = 0.3  # how far a highlighted tile leans towards GREEN
 
 
-def draw_checkers(
-    screen: pygame.Surface, available_moves: list[tuple[int, int]] | None
-) -> tuple[int, int, int, int]:
-    if screen.get_height() < screen.get_width():
-        rect_height = screen.get_height() // 8
+def get_layout(width: int, height: int) -> tuple[int, int, int, int]:
+    if height < width:
+        rect_height = height // 8
         rect_width = rect_height
-        left = (screen.get_width() - screen.get_height()) // 2
-        top = (screen.get_height() % rect_height) // 2
+        left = (width - height) // 2
+        top = (height % rect_height) // 2
     else:
-        rect_height = screen.get_width() // 8
+        rect_height = width // 8
         rect_width = rect_height
-        left = (screen.get_width() % rect_width) // 2
-        top = (screen.get_height() - screen.get_width()) // 2
-    for i in range(8):
-        for j in range(8):
-            if available_moves is not None and (j, i) in available_moves:
-                light_brown = LIGHT_BROWN.lerp(GREEN, 0.3)
-                dark_brown = DARK_BROWN.lerp(GREEN, 0.3)
-            else:
-                light_brown = LIGHT_BROWN
-                dark_brown = DARK_BROWN
-            if i % 2 == 0:
-                if j % 2 == 0:
-                    pygame.draw.rect(
-                        screen,
-                        light_brown,
-                        (
-                            left + rect_width * j,
-                            top + rect_height * i,
-                            rect_width,
-                            rect_height,
-                        ),
-                    )
-                else:
-                    pygame.draw.rect(
-                        screen,
-                        dark_brown,
-                        (
-                            left + rect_width * j,
-                            top + rect_height * i,
-                            rect_width,
-                            rect_height,
-                        ),
-                    )
-            else:
-                if j % 2 == 0:
-                    pygame.draw.rect(
-                        screen,
-                        dark_brown,
-                        (
-                            left + rect_width * j,
-                            top + rect_height * i,
-                            rect_width,
-                            rect_height,
-                        ),
-                    )
-                else:
-                    pygame.draw.rect(
-                        screen,
-                        light_brown,
-                        (
-                            left + rect_width * j,
-                            top + rect_height * i,
-                            rect_width,
-                            rect_height,
-                        ),
-                    )
+        left = (width % rect_width) // 2
+        top = (height - width) // 2
     return left, top, rect_width, rect_height
+
+
+class Checkerboard:
+    # the squares only change with the window size, so they are drawn once and
+    # every frame is one blit plus a tile per highlighted square
+    def __init__(self) -> None:
+        self.size: tuple[int, int] | None = None
+        self.pos_and_size = (0, 0, 0, 0)
+        self.surface: pygame.Surface | None = None
+        self.tiles: dict[tuple[tuple[int, ...], float, bool], pygame.Surface] = {}
+
+    def draw(
+        self, screen: pygame.Surface, available_moves: set[tuple[int, int]] | None
+    ) -> tuple[int, int, int, int]:
+        if screen.get_size() != self.size:
+            self._render(screen.get_size())
+        assert self.surface is not None
+        screen.blit(self.surface, self.pos_and_size[:2])
+        if available_moves:
+            self.draw_highlights(screen, available_moves, GREEN, MOVE_HIGHLIGHT)
+        return self.pos_and_size
+
+    def draw_highlights(
+        self,
+        screen: pygame.Surface,
+        coords: Iterable[tuple[int, int]],
+        color: pygame.Color,
+        amount: float,
+    ):
+        left, top, rect_width, rect_height = self.pos_and_size
+        for x, y in coords:
+            screen.blit(
+                self._get_tile(color, amount, (x + y) % 2 == 0),
+                (left + rect_width * x, top + rect_height * y),
+            )
+
+    def draw_square(
+        self, screen: pygame.Surface, x: int, y: int, highlighted: bool
+    ) -> pygame.Rect:
+        left, top, rect_width, rect_height = self.pos_and_size
+        rect = pygame.Rect(
+            left + rect_width * x, top + rect_height * y, rect_width, rect_height
+        )
+        if highlighted:
+            screen.blit(self._get_tile(GREEN, MOVE_HIGHLIGHT, (x + y) % 2 == 0), rect)
+        else:
+            assert self.surface is not None
+            area = (rect_width * x, rect_height * y, rect_width, rect_height)
+            screen.blit(self.surface, rect, area)
+        return rect
+
+    def _get_tile(
+        self, color: pygame.Color, amount: float, light: bool
+    ) -> pygame.Surface:
+        key = (tuple(color), amount, light)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = pygame.Surface(self.pos_and_size[2:]).convert()
+            tile.fill((LIGHT_BROWN if light else DARK_BROWN).lerp(color, amount))
+            self.tiles[key] = tile
+        return tile
+
+    def _render(self, size: tuple[int, int]):
+        self.size = size
+        self.pos_and_size = get_layout(*size)
+        self.tiles.clear()
+        _, _, rect_width, rect_height = self.pos_and_size
+        self.surface = pygame.Surface((rect_width * 8, rect_height * 8)).convert()
+        for y in range(8):
+            for x in range(8):
+                self.surface.fill(
+                    LIGHT_BROWN if (x + y) % 2 == 0 else DARK_BROWN,
+                    (rect_width * x, rect_height * y, rect_width, rect_height),
+                )
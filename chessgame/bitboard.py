@@ -0,0 +1,292 @@
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    from .board import Board
+
+# square index is y * 8 + x, so bit 0 is the top left tile (black's rook)
+
+WHITE = 0
+BLACK = 1
+
+PAWN = 0
+KNIGHT = 1
+BISHOP = 2
+ROOK = 3
+QUEEN = 4
+KING = 5
+
+PIECE_TYPES_COUNT = 6
+PROMOTION_TYPES = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+
+FULL = (1 << 64) - 1
+RANK_8 = 0xFF  # y == 0
+RANK_7 = RANK_8 << 8
+RANK_2 = RANK_8 << 48
+RANK_1 = RANK_8 << 56
+# the tile colors of background.py, a8 (bit 0) is light
+LIGHT_SQUARES = sum(1 << sq for sq in range(64) if (sq + (sq >> 3)) % 2 == 0)
+DARK_SQUARES = FULL ^ LIGHT_SQUARES
+
+# (from, to, promotion)
+Move = tuple[int, int, int | None]
+
+
+def square(x: int, y: int) -> int:
+    return y * 8 + x
+
+
+def coords(sq: int) -> tuple[int, int]:
+    return sq & 7, sq >> 3
+
+
+def square_name(sq: int) -> str:
+    x, y = coords(sq)
+    return "abcdefgh"[x] + str(8 - y)
+
+
+def parse_square(name: str) -> int:
+    if len(name) != 2 or name[0] not in "abcdefgh" or name[1] not in "12345678":
+        raise ValueError(f"invalid square: {name}")
+    return square(ord(name[0]) - ord("a"), 8 - int(name[1]))
+
+
+def iter_squares(bb: int) -> Iterator[int]:
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+
+def _build_leaper_table(offsets: tuple[tuple[int, int], ...]) -> tuple[int, ...]:
+    table = []
+    for sq in range(64):
+        x, y = coords(sq)
+        attacks = 0
+        for offset_x, offset_y in offsets:
+            if 0 <= x + offset_x < 8 and 0 <= y + offset_y < 8:
+                attacks |= 1 << square(x + offset_x, y + offset_y)
+        table.append(attacks)
+    return tuple(table)
+
+
+def _build_ray_table(offset_x: int, offset_y: int) -> tuple[int, ...]:
+    table = []
+    for sq in range(64):
+        x, y = coords(sq)
+        ray = 0
+        x += offset_x
+        y += offset_y
+        while 0 <= x < 8 and 0 <= y < 8:
+            ray |= 1 << square(x, y)
+            x += offset_x
+            y += offset_y
+        table.append(ray)
+    return tuple(table)
+
+
+KNIGHT_ATTACKS = _build_leaper_table(
+    ((-2, -1), (-1, -2), (1, -2), (2, -1), (2, 1), (1, 2), (-1, 2), (-2, 1))
+)
+KING_ATTACKS = _build_leaper_table(
+    ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+)
+PAWN_ATTACKS = (
+    _build_leaper_table(((-1, -1), (1, -1))),  # white moves up the board
+    _build_leaper_table(((-1, 1), (1, 1))),  # black moves down the board
+)
+
+# rays that go towards higher squares stop at the lowest blocker, the others
+# at the highest one
+NORTH = _build_ray_table(0, -1)
+SOUTH = _build_ray_table(0, 1)
+EAST = _build_ray_table(1, 0)
+WEST = _build_ray_table(-1, 0)
+NORTH_EAST = _build_ray_table(1, -1)
+SOUTH_EAST = _build_ray_table(1, 1)
+NORTH_WEST = _build_ray_table(-1, -1)
+SOUTH_WEST = _build_ray_table(-1, 1)
+ROOK_RAYS = ((SOUTH, EAST), (NORTH, WEST))
+BISHOP_RAYS = ((SOUTH_EAST, SOUTH_WEST), (NORTH_EAST, NORTH_WEST))
+
+
+def _slide(
+    sq: int, occupied: int, rays: tuple[tuple[tuple[int, ...], ...], ...]
+) -> int:
+    positive, negative = rays
+    attacks = 0
+    for table in positive:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= table[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for table in negative:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= table[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def attackers_to(bitboards: list[int], sq: int, color: int, occupied: int) -> int:
+    base = color * PIECE_TYPES_COUNT
+    attackers = PAWN_ATTACKS[color ^ 1][sq] & bitboards[base + PAWN]
+    attackers |= KNIGHT_ATTACKS[sq] & bitboards[base + KNIGHT]
+    attackers |= KING_ATTACKS[sq] & bitboards[base + KING]
+    queens = bitboards[base + QUEEN]
+    rooks = bitboards[base + ROOK] | queens
+    if rooks:
+        attackers |= _slide(sq, occupied, ROOK_RAYS) & rooks
+    bishops = bitboards[base + BISHOP] | queens
+    if bishops:
+        attackers |= _slide(sq, occupied, BISHOP_RAYS) & bishops
+    return attackers
+
+
+def is_square_attacked(
+    bitboards: list[int], sq: int, color: int, occupied: int
+) -> bool:
+    return attackers_to(bitboards, sq, color, occupied) != 0
+
+
+def _build_between_table() -> tuple[tuple[int, ...], ...]:
+    table = [[0] * 64 for _ in range(64)]
+    for rays in (*ROOK_RAYS, *BISHOP_RAYS):
+        for ray in rays:
+            for start in range(64):
+                for end in iter_squares(ray[start]):
+                    table[start][end] = ray[start] ^ ray[end] ^ (1 << end)
+    return tuple(tuple(row) for row in table)
+
+
+# squares strictly between two squares on the same line, 0 otherwise
+BETWEEN = _build_between_table()
+
+
+# king square, rook square, squares that must be empty, squares the king crosses
+CASTLES = (
+    (WHITE_KINGSIDE, 60, 63, (61, 62), (60, 61, 62)),
+    (WHITE_QUEENSIDE, 60, 56, (57, 58, 59), (60, 59, 58)),
+    (BLACK_KINGSIDE, 4, 7, (5, 6), (4, 5, 6)),
+    (BLACK_QUEENSIDE, 4, 0, (1, 2, 3), (4, 3, 2)),
+)
+
+
+def generate_legal_moves(board: "Board", color: int, origins: int = FULL) -> list[Move]:
+    bitboards = board.bitboards
+    base = color * PIECE_TYPES_COUNT
+    enemy = color ^ 1
+    enemy_base = enemy * PIECE_TYPES_COUNT
+    ours = board.occupied[color]
+    theirs = board.occupied[enemy]
+    occupied = ours | theirs
+    empty = FULL ^ occupied
+    moves: list[Move] = []
+
+    king_bb = bitboards[base + KING]
+    if not king_bb:
+        raise Exception("How king dead")
+    king_sq = king_bb.bit_length() - 1
+
+    # one look from the king finds both the checkers and the pinned pieces
+    checkers = attackers_to(bitboards, king_sq, enemy, occupied)
+    pins: dict[int, int] = {}
+    enemy_queens = bitboards[enemy_base + QUEEN]
+    snipers = _slide(king_sq, theirs, ROOK_RAYS) & (
+        bitboards[enemy_base + ROOK] | enemy_queens
+    )
+    snipers |= _slide(king_sq, theirs, BISHOP_RAYS) & (
+        bitboards[enemy_base + BISHOP] | enemy_queens
+    )
+    for sniper in iter_squares(snipers):
+        between = BETWEEN[king_sq][sniper] & occupied
+        if between and between & (between - 1) == 0 and between & ours:
+            pins[between.bit_length() - 1] = BETWEEN[king_sq][sniper] | 1 << sniper
+
+    if king_bb & origins:
+        king_occupied = occupied ^ king_bb
+        for to in iter_squares(KING_ATTACKS[king_sq] & ~ours):
+            if not attackers_to(bitboards, to, enemy, king_occupied):
+                moves.append((king_sq, to, None))
+    if checkers & (checkers - 1):  # double check, only the king can move
+        return moves
+    if checkers:
+        target_mask = (BETWEEN[king_sq][checkers.bit_length() - 1] | checkers) & ~ours
+    else:
+        target_mask = ~ours
+
+    for sq in iter_squares(bitboards[base + KNIGHT] & origins):
+        if sq in pins:  # a pinned knight can never stay on the pin ray
+            continue
+        for to in iter_squares(KNIGHT_ATTACKS[sq] & target_mask):
+            moves.append((sq, to, None))
+    for sq in iter_squares(
+        (bitboards[base + BISHOP] | bitboards[base + QUEEN]) & origins
+    ):
+        targets = _slide(sq, occupied, BISHOP_RAYS) & target_mask
+        if sq in pins:
+            targets &= pins[sq]
+        for to in iter_squares(targets):
+            moves.append((sq, to, None))
+    for sq in iter_squares(
+        (bitboards[base + ROOK] | bitboards[base + QUEEN]) & origins
+    ):
+        targets = _slide(sq, occupied, ROOK_RAYS) & target_mask
+        if sq in pins:
+            targets &= pins[sq]
+        for to in iter_squares(targets):
+            moves.append((sq, to, None))
+
+    if color == WHITE:
+        forward = -8
+        start_rank = RANK_2
+        last_rank = RANK_8
+    else:
+        forward = 8
+        start_rank = RANK_7
+        last_rank = RANK_1
+    ep_square = board.ep_square
+    pawn_attacks = PAWN_ATTACKS[color]
+    for sq in iter_squares(bitboards[base + PAWN] & origins):
+        targets = pawn_attacks[sq] & theirs
+        push = sq + forward
+        if empty & (1 << push):
+            targets |= 1 << push
+            if start_rank & (1 << sq) and empty & (1 << (push + forward)):
+                targets |= 1 << (push + forward)
+        targets &= target_mask
+        if sq in pins:
+            targets &= pins[sq]
+        for to in iter_squares(targets):
+            if last_rank & (1 << to):
+                for promotion in PROMOTION_TYPES:
+                    moves.append((sq, to, promotion))
+            else:
+                moves.append((sq, to, None))
+        if ep_square is not None and pawn_attacks[sq] & (1 << ep_square):
+            # two pawns leave the same rank at once, so just look at the result
+            captured = 1 << (ep_square - forward)
+            after = occupied ^ (1 << sq) ^ captured | 1 << ep_square
+            if not attackers_to(bitboards, king_sq, enemy, after) & ~captured:
+                moves.append((sq, ep_square, None))
+
+    if king_bb & origins and not checkers:
+        rights = board.castling_rights
+        rooks = bitboards[base + ROOK]
+        for right, king_from, rook_from, between, crossed in CASTLES:
+            if not rights & right or king_from != king_sq:
+                continue
+            if not rooks & (1 << rook_from):
+                continue
+            if any(occupied & (1 << sq) for sq in between):
+                continue
+            if any(attackers_to(bitboards, sq, enemy, occupied) for sq in crossed[1:]):
+                continue
+            moves.append((king_sq, rook_from, None))
+    return moves
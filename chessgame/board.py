@@ -1,50 +1,530 @@
-import pygame
-from .piece import Piece, PieceColor, PieceType, TILES_COUNT_X, TILES_COUNT_Y
+from typing import NamedTuple
+
+from . import bitboard, evaluation, zobrist
+from .piece import (
+    COLOR_INDEX,
+    COLORS,
+    TYPE_INDEX,
+    Piece,
+    PieceColor,
+    PieceType,
+    TILES_COUNT_X,
+    TILES_COUNT_Y,
+)
+
+PROMOTION_TYPES = {
+    bitboard.KNIGHT: PieceType.KNIGHT,
+    bitboard.BISHOP: PieceType.BISHOP,
+    bitboard.ROOK: PieceType.ROOK,
+    bitboard.QUEEN: PieceType.QUEEN,
+}
+
+
+FIFTY_MOVE_PLIES = 100
+REPETITION_COUNT = 3
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# bitboard piece index per letter
+FEN_CHARS = "PNBRQKpnbrqk"
+FEN_INDEXES = {char: index for index, char in enumerate(FEN_CHARS)}
+
+# castling letter, right, row, rook column
+FEN_CASTLING = (
+    ("K", bitboard.WHITE_KINGSIDE, 7, 7),
+    ("Q", bitboard.WHITE_QUEENSIDE, 7, 0),
+    ("k", bitboard.BLACK_KINGSIDE, 0, 7),
+    ("q", bitboard.BLACK_QUEENSIDE, 0, 0),
+)
+PAWN_START_ROWS = (6, 1)  # by bitboard color
+
+
+def piece_index(piece: Piece) -> int:
+    return piece.color_index * bitboard.PIECE_TYPES_COUNT + piece.type_index
+
+
+class Undo(NamedTuple):
+    move: bitboard.Move
+    piece: Piece
+    captured: Piece | None  # the rook when castling
+    had_moved: bool
+    castling_rights: int
+    ep_square: int | None
+    hash: int
+    halfmove_clock: int
+
+
+# castling rights kept when a piece leaves or lands on the square
+CASTLING_MASKS = [
+    bitboard.WHITE_KINGSIDE
+    | bitboard.WHITE_QUEENSIDE
+    | bitboard.BLACK_KINGSIDE
+    | bitboard.BLACK_QUEENSIDE
+] * 64
+CASTLING_MASKS[0] ^= bitboard.BLACK_QUEENSIDE
+CASTLING_MASKS[4] ^= bitboard.BLACK_KINGSIDE | bitboard.BLACK_QUEENSIDE
+CASTLING_MASKS[7] ^= bitboard.BLACK_KINGSIDE
+CASTLING_MASKS[56] ^= bitboard.WHITE_QUEENSIDE
+CASTLING_MASKS[60] ^= bitboard.WHITE_KINGSIDE | bitboard.WHITE_QUEENSIDE
+CASTLING_MASKS[63] ^= bitboard.WHITE_KINGSIDE
 
 
 class Board:
-    tiles: list[list[Piece | None]]
-    pieces_left: list[Piece]
+    __slots__ = (
+        "_tiles",
+        "squares",
+        "pieces",
+        "bitboards",
+        "occupied",
+        "history",
+        "promoted_piece",
+        "side",
+        "castling_rights",
+        "ep_square",
+        "hash",
+        "mg_score",
+        "eg_score",
+        "phase",
+        "halfmove_clock",
+        "fullmove_number",
+    )
+
+    squares: bytearray
+    pieces: list[list[Piece]]
+    bitboards: list[int]
+    occupied: list[int]
+    history: list[Undo]
 
     def __init__(self) -> None:
-        self.tiles = []
-        self.pieces_left = []
-        self.white_king: Piece | None = None
-        self.black_king: Piece | None = None
+        # the Piece objects are only made once something asks for them, see tiles
+        self._tiles: list[list[Piece | None]] | None = None
+        # piece_index + 1 per square, 0 when empty
+        self.squares = bytearray(TILES_COUNT_X * TILES_COUNT_Y)
+        # pieces still on the board, by bitboard color, in no particular order
+        self.pieces = [[], []]
+        self.bitboards = [0] * (2 * bitboard.PIECE_TYPES_COUNT)
+        self.occupied = [0, 0]
+        self.history = []
         self.promoted_piece: Piece | None = None
-        self.enpassants: list[Piece] = []
-        for _ in range(TILES_COUNT_Y):
-            self.tiles.append([None] * TILES_COUNT_X)
+        self.side = bitboard.WHITE  # to move, turn has it as a PieceColor
+        self.castling_rights = 0
+        self.ep_square: int | None = None
+        self.hash = 0
+        # running evaluation terms, see evaluation.py
+        self.mg_score = 0
+        self.eg_score = 0
+        self.phase = 0
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+
+    @classmethod
+    def from_fen(cls, fen: str) -> "Board":
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"invalid fen: {fen}")
+        placement, turn, castling, ep = fields[:4]
+        rows = placement.split("/")
+        if len(rows) != TILES_COUNT_Y or turn not in ("w", "b"):
+            raise ValueError(f"invalid fen: {fen}")
+
+        # straight into the bitboards, loading many positions for the engine
+        # should not pay for Piece objects it never looks at
+        board = cls()
+        bitboards = board.bitboards
+        squares = board.squares
+        piece_keys = zobrist.PIECE_KEYS
+        mg_scores = evaluation.MG_SCORES
+        eg_scores = evaluation.EG_SCORES
+        phases = evaluation.PHASES
+        key = mg_score = eg_score = phase = 0
+        sq = 0
+        for row in rows:
+            row_end = sq + TILES_COUNT_X
+            for char in row:
+                index = FEN_INDEXES.get(char)
+                if index is None:
+                    if char not in "12345678":
+                        raise ValueError(f"invalid fen: {fen}")
+                    sq += ord(char) - ord("0")
+                    continue
+                if sq >= row_end:
+                    raise ValueError(f"invalid fen: {fen}")
+                bitboards[index] |= 1 << sq
+                squares[sq] = index + 1
+                key ^= piece_keys[index][sq]
+                mg_score += mg_scores[index][sq]
+                eg_score += eg_scores[index][sq]
+                phase += phases[index]
+                sq += 1
+            if sq != row_end:
+                raise ValueError(f"invalid fen: {fen}")
+        for color in (bitboard.WHITE, bitboard.BLACK):
+            base = color * bitboard.PIECE_TYPES_COUNT
+            if bitboards[base + bitboard.KING].bit_count() != 1:
+                raise ValueError(f"invalid fen: {fen}")
+            for index in range(base, base + bitboard.PIECE_TYPES_COUNT):
+                board.occupied[color] |= bitboards[index]
+
+        # a right only counts while its king and rook are still at home
+        for char, right, y, rook_x in FEN_CASTLING:
+            color = bitboard.WHITE if char.isupper() else bitboard.BLACK
+            base = color * bitboard.PIECE_TYPES_COUNT
+            if (
+                char in castling
+                and squares[y * TILES_COUNT_X + 4] == base + bitboard.KING + 1
+                and squares[y * TILES_COUNT_X + rook_x] == base + bitboard.ROOK + 1
+            ):
+                board.castling_rights |= right
+        key ^= zobrist.CASTLING_KEYS[board.castling_rights]
+        board.side = bitboard.WHITE if turn == "w" else bitboard.BLACK
+        if board.side == bitboard.BLACK:
+            key ^= zobrist.BLACK_TO_MOVE_KEY
+        if ep != "-":
+            # like make_move, only keep it when a pawn can take there
+            sq = bitboard.parse_square(ep)
+            color = board.side
+            pawns = bitboards[color * bitboard.PIECE_TYPES_COUNT + bitboard.PAWN]
+            if bitboard.PAWN_ATTACKS[color ^ 1][sq] & pawns:
+                board.ep_square = sq
+                key ^= zobrist.EP_KEYS[sq & 7]
+        if len(fields) > 4:
+            board.halfmove_clock = int(fields[4])
+        if len(fields) > 5:
+            board.fullmove_number = int(fields[5])
+        board.hash = key
+        board.mg_score = mg_score
+        board.eg_score = eg_score
+        board.phase = phase
+        return board
+
+    def to_fen(self) -> str:
+        rows = []
+        text = ""
+        empty = 0
+        for sq, code in enumerate(self.squares):
+            if code:
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += FEN_CHARS[code - 1]
+            else:
+                empty += 1
+            if sq & 7 == 7:
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                rows.append(text)
+                text = ""
+        turn = "w" if self.side == bitboard.WHITE else "b"
+        castling = "".join(
+            char for char, right, _, _ in FEN_CASTLING if self.castling_rights & right
+        )
+        ep = "-" if self.ep_square is None else bitboard.square_name(self.ep_square)
+        return (
+            f"{'/'.join(rows)} {turn} {castling or '-'} {ep} "
+            f"{self.halfmove_clock} {self.fullmove_number}"
+        )
+
+    @property
+    def tiles(self) -> list[list[Piece | None]]:
+        if self._tiles is None:
+            self._create_pieces()
+            assert self._tiles is not None
+        return self._tiles
+
+    @property
+    def turn(self) -> PieceColor:
+        return COLORS[self.side]
+
+    def _create_pieces(self):
+        # from the squares, kings and rooks count as unmoved only when a
+        # castling right still names them, like from_fen reads it
+        unmoved = 0
+        for char, right, y, rook_x in FEN_CASTLING:
+            if self.castling_rights & right:
+                unmoved |= 1 << (y * TILES_COUNT_X + 4) | 1 << (
+                    y * TILES_COUNT_X + rook_x
+                )
+        self._tiles = [[None] * TILES_COUNT_X for _ in range(TILES_COUNT_Y)]
+        self.pieces = [[], []]
+        for sq, code in enumerate(self.squares):
+            if not code:
+                continue
+            y, x = divmod(sq, TILES_COUNT_X)
+            color, piece_type = divmod(code - 1, bitboard.PIECE_TYPES_COUNT)
+            if piece_type == bitboard.PAWN:
+                has_moved = y != PAWN_START_ROWS[color]
+            else:
+                has_moved = not unmoved >> sq & 1
+            piece = Piece.from_index(code - 1, self, x, y, has_moved)
+            self._tiles[y][x] = piece
+            self.add_piece(piece)
+
+    def copy(self) -> "Board":
+        board = Board()
+        board.squares = self.squares.copy()
+        board.bitboards = self.bitboards.copy()
+        board.occupied = self.occupied.copy()
+        board.side = self.side
+        board.castling_rights = self.castling_rights
+        board.ep_square = self.ep_square
+        board.hash = self.hash
+        board.mg_score = self.mg_score
+        board.eg_score = self.eg_score
+        board.phase = self.phase
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+        if self._tiles is None:  # no pieces yet, so no history either
+            return board
+
+        board._tiles = [[None] * TILES_COUNT_X for _ in range(TILES_COUNT_Y)]
+        copies: dict[Piece, Piece] = {}
+        for color, pieces in enumerate(self.pieces):
+            for piece in pieces:
+                copies[piece] = piece.copy(board)
+                board._tiles[piece.pos_y][piece.pos_x] = copies[piece]
+                board.pieces[color].append(copies[piece])
+        # captured pieces only live in the history until they are unmade
+        for undo in self.history:
+            for piece in (undo.piece, undo.captured):
+                if piece is not None and piece not in copies:
+                    copies[piece] = piece.copy(board)
+        board.history = [
+            undo._replace(
+                piece=copies[undo.piece],
+                captured=None if undo.captured is None else copies[undo.captured],
+            )
+            for undo in self.history
+        ]
+        if self.promoted_piece is not None:
+            board.promoted_piece = copies[self.promoted_piece]
+        return board
+
+    def add_piece(self, piece: Piece):
+        pieces = self.pieces[piece.color_index]
+        piece.list_index = len(pieces)
+        pieces.append(piece)
+
+    def remove_piece(self, piece: Piece):
+        # move the last piece into the hole instead of shifting the list
+        pieces = self.pieces[piece.color_index]
+        last = pieces.pop()
+        if last is not piece:
+            pieces[piece.list_index] = last
+            last.list_index = piece.list_index
+        piece.list_index = -1
+
+    def put_piece(self, piece: Piece):
+        self.tiles[piece.pos_y][piece.pos_x] = piece
+        sq = bitboard.square(piece.pos_x, piece.pos_y)
+        index = piece_index(piece)
+        self.bitboards[index] |= 1 << sq
+        self.occupied[piece.color_index] |= 1 << sq
+        self.squares[sq] = index + 1
+        self.hash ^= zobrist.PIECE_KEYS[index][sq]
+        self.mg_score += evaluation.MG_SCORES[index][sq]
+        self.eg_score += evaluation.EG_SCORES[index][sq]
+        self.phase += evaluation.PHASES[index]
+
+    def lift_piece(self, piece: Piece):
+        self.tiles[piece.pos_y][piece.pos_x] = None
+        sq = bitboard.square(piece.pos_x, piece.pos_y)
+        index = piece_index(piece)
+        self.bitboards[index] &= ~(1 << sq)
+        self.occupied[piece.color_index] &= ~(1 << sq)
+        self.squares[sq] = 0
+        self.hash ^= zobrist.PIECE_KEYS[index][sq]
+        self.mg_score -= evaluation.MG_SCORES[index][sq]
+        self.eg_score -= evaluation.EG_SCORES[index][sq]
+        self.phase -= evaluation.PHASES[index]
+
+    def legal_moves(self, color: PieceColor | None = None) -> list[bitboard.Move]:
+        side = self.side if color is None else COLOR_INDEX[color]
+        return bitboard.generate_legal_moves(self, side)
+
+    def is_in_check(self, color: PieceColor | None = None) -> bool:
+        index = self.side if color is None else COLOR_INDEX[color]
+        king = self.bitboards[index * bitboard.PIECE_TYPES_COUNT + bitboard.KING]
+        return bitboard.is_square_attacked(
+            self.bitboards,
+            king.bit_length() - 1,
+            index ^ 1,
+            self.occupied[0] | self.occupied[1],
+        )
+
+    def get_repetition_count(self) -> int:
+        # positions from before the last capture or pawn move cannot come back,
+        # and only every other one has the same side to move
+        count = 1
+        end = len(self.history)
+        first = max(end - self.halfmove_clock, 0)
+        for index in range(end - 2, first - 1, -2):
+            if self.history[index].hash == self.hash:
+                count += 1
+        return count
+
+    def is_insufficient_material(self) -> bool:
+        bitboards = self.bitboards
+        knights = bishops = 0
+        for base in (0, bitboard.PIECE_TYPES_COUNT):
+            if (
+                bitboards[base + bitboard.PAWN]
+                | bitboards[base + bitboard.ROOK]
+                | bitboards[base + bitboard.QUEEN]
+            ):
+                return False
+            knights |= bitboards[base + bitboard.KNIGHT]
+            bishops |= bitboards[base + bitboard.BISHOP]
+        minors = knights | bishops
+        if minors & (minors - 1) == 0:  # a lone minor piece cannot mate
+            return True
+        # neither can any number of bishops that all walk the same color
+        return not knights and (
+            not bishops & bitboard.LIGHT_SQUARES or not bishops & bitboard.DARK_SQUARES
+        )
+
+    def get_draw_reason(self) -> str | None:
+        # stalemate is left to the caller, which has the legal moves already
+        if self.halfmove_clock >= FIFTY_MOVE_PLIES:
+            return "fifty moves"
+        if self.is_insufficient_material():
+            return "insufficient material"
+        if self.get_repetition_count() >= REPETITION_COUNT:
+            return "repetition"
+        return None
 
     def move_piece(self, x1: int, y1: int, x2: int, y2: int):
         moved_piece = self.get_piece(x1, y1)
-        target = self.tiles[y2][x2]
         if moved_piece is None:
             raise ValueError("you tried to move nothing")
+        promotion = None
+        if self._can_promote(moved_piece, y2):
+            promotion = bitboard.QUEEN
+        self.make_move((bitboard.square(x1, y1), bitboard.square(x2, y2), promotion))
+        if promotion is not None:
+            self.promoted_piece = moved_piece
 
-        if self._can_enpassant(moved_piece, x2, y2):
-            self._enpassant(moved_piece, x2, y2)
-        elif target is not None and self._can_castle(moved_piece, target):
-            self._castle(moved_piece, target, x1, y1, x2, y2)
-            return
+    def promote(self, piece_type: PieceType):
+        piece = self.promoted_piece
+        if piece is None:
+            raise ValueError("there is nothing to promote")
+        self.lift_piece(piece)
+        piece.set_type(TYPE_INDEX[piece_type])
+        self.put_piece(piece)
+        self.promoted_piece = None
+        undo = self.history[-1]
+        from_sq, to, _ = undo.move
+        self.history[-1] = undo._replace(move=(from_sq, to, piece.type_index))
+
+    def make_move(self, move: bitboard.Move):
+        from_sq, to, promotion = move
+        x1, y1 = bitboard.coords(from_sq)
+        x2, y2 = bitboard.coords(to)
+        tiles = self.tiles
+        moved_piece = tiles[y1][x1]
+        target = tiles[y2][x2]
+        if moved_piece is None:
+            raise ValueError("you tried to move nothing")
+        ep_square = self.ep_square
+        key = self.hash
 
-        self._clear_enpassants()
+        if target is not None and self._can_castle(moved_piece, target):
+            self.history.append(
+                Undo(
+                    move,
+                    moved_piece,
+                    target,
+                    False,
+                    self.castling_rights,
+                    ep_square,
+                    key,
+                    self.halfmove_clock,
+                )
+            )
+            self._castle(moved_piece, target)
+            self.halfmove_clock += 1
+        else:
+            if target is None and self._can_enpassant(moved_piece, to):
+                target = self._enpassant(moved_piece, x2, y2)
+            elif target is not None:
+                if moved_piece.color_index == target.color_index:
+                    raise Exception("you killed your own kind")
+                self.lift_piece(target)
+                self.remove_piece(target)
+            self.history.append(
+                Undo(
+                    move,
+                    moved_piece,
+                    target,
+                    moved_piece.has_moved,
+                    self.castling_rights,
+                    ep_square,
+                    key,
+                    self.halfmove_clock,
+                )
+            )
+            if target is not None or moved_piece.type_index == bitboard.PAWN:
+                self.halfmove_clock = 0
+            else:
+                self.halfmove_clock += 1
+            self.lift_piece(moved_piece)
+            moved_piece.pos_x = x2
+            moved_piece.pos_y = y2
+            moved_piece.has_moved = True
+            if promotion is not None:
+                moved_piece.set_type(promotion)
+            self.put_piece(moved_piece)
+            self.ep_square = None
+            self._add_enpassant(moved_piece, y1, x2, y2)
 
-        moved_piece.pos_x = x2
-        moved_piece.pos_y = y2
-        moved_piece.has_moved = True
+        castling_rights = self.castling_rights
+        self.castling_rights &= CASTLING_MASKS[from_sq] & CASTLING_MASKS[to]
+        self.hash ^= (
+            zobrist.CASTLING_KEYS[castling_rights]
+            ^ zobrist.CASTLING_KEYS[self.castling_rights]
+            ^ zobrist.BLACK_TO_MOVE_KEY
+        )
+        if ep_square is not None:
+            self.hash ^= zobrist.EP_KEYS[ep_square & 7]
+        if self.ep_square is not None:
+            self.hash ^= zobrist.EP_KEYS[self.ep_square & 7]
+        if self.side == bitboard.BLACK:
+            self.fullmove_number += 1
+        self.side ^= 1
 
-        if self._can_promote(moved_piece, y2):
-            self.promoted_piece = moved_piece
+    def unmake_move(self):
+        undo = self.history.pop()
+        from_sq, to, promotion = undo.move
+        moved_piece = undo.piece
+        captured = undo.captured
+        self.side ^= 1
+        self.castling_rights = undo.castling_rights
+        self.ep_square = undo.ep_square
+        self.halfmove_clock = undo.halfmove_clock
+        if self.side == bitboard.BLACK:
+            self.fullmove_number -= 1
+        self.promoted_piece = None
 
-        self.tiles[y1][x1] = None
-        self.tiles[y2][x2] = moved_piece
-        self._add_enpassant(moved_piece, y1, x2, y2)
-        if target is None:
-            return
-        self.pieces_left.remove(target)
-        if moved_piece.color == target.color:
-            raise Exception("you killed your own kind")
+        if captured is not None and captured.color_index == moved_piece.color_index:
+            self.lift_piece(moved_piece)
+            self.lift_piece(captured)
+            moved_piece.pos_x, moved_piece.pos_y = bitboard.coords(from_sq)
+            captured.pos_x, captured.pos_y = bitboard.coords(to)
+            moved_piece.has_moved = False
+            captured.has_moved = False
+            self.put_piece(moved_piece)
+            self.put_piece(captured)
+        else:
+            self.lift_piece(moved_piece)
+            if promotion is not None:
+                moved_piece.set_type(bitboard.PAWN)
+            moved_piece.pos_x, moved_piece.pos_y = bitboard.coords(from_sq)
+            moved_piece.has_moved = undo.had_moved
+            self.put_piece(moved_piece)
+            if captured is not None:
+                self.put_piece(captured)
+                self.add_piece(captured)
+        self.hash = undo.hash
 
     def get_piece(self, x: int, y: int) -> Piece | None:
         if x < 0 or y < 0:
@@ -54,118 +534,67 @@ class Board:
     def is_in_bound(self, x: int, y: int) -> bool:
         return x in range(0, TILES_COUNT_X) and y in range(0, TILES_COUNT_Y)
 
-    def _enpassant(self, moved_piece: Piece, x2: int, y2: int):
-        if moved_piece.color == PieceColor.WHITE:
+    def _enpassant(self, moved_piece: Piece, x2: int, y2: int) -> Piece:
+        if moved_piece.color_index == bitboard.WHITE:
             target = self.get_piece(x2, y2 + 1)
-            self.tiles[y2 + 1][x2] = None
-        elif moved_piece.color == PieceColor.BLACK:
+        else:
             target = self.get_piece(x2, y2 - 1)
-            self.tiles[y2 - 1][x2] = None
         assert target is not None
-        self.pieces_left.remove(target)
+        self.lift_piece(target)
+        self.remove_piece(target)
+        return target
 
     def _add_enpassant(self, moved_piece: Piece, y1: int, x2: int, y2: int):
         if not abs(y2 - y1) == 2:
             return
-        if moved_piece.piece_type != PieceType.PAWN:
+        if moved_piece.type_index != bitboard.PAWN:
             return
 
-        targets: list[Piece | None] = []
         for offset_x in (-1, 1):
-            if self.is_in_bound(x2 + offset_x, y2):
-                targets.append(self.get_piece(x2 + offset_x, y2))
-
-        for target in targets:
+            if not self.is_in_bound(x2 + offset_x, y2):
+                continue
+            target = self.get_piece(x2 + offset_x, y2)
             if target is None:
                 continue
-            if target.piece_type != PieceType.PAWN:
+            if target.type_index != bitboard.PAWN:
                 continue
-            if target.color == moved_piece.color:
+            if target.color_index == moved_piece.color_index:
                 continue
-            if moved_piece.color == PieceColor.WHITE:
-                target.enpassant = x2, y2 + 1
-            elif moved_piece.color == PieceColor.BLACK:
-                target.enpassant = x2, y2 - 1
-            self.enpassants.append(target)
-
-    def _castle(
-        self, moved_piece: Piece, target: Piece, x1: int, y1: int, x2: int, y2: int
-    ):
+            self.ep_square = bitboard.square(x2, (y1 + y2) // 2)
+            return
+
+    def _castle(self, moved_piece: Piece, target: Piece):
+        self.lift_piece(moved_piece)
+        self.lift_piece(target)
         if moved_piece.pos_x < target.pos_x:  # right rook
-            moved_piece.pos_x = x1 + 2
-            target.pos_x = x2 - 2
+            moved_piece.pos_x += 2
+            target.pos_x -= 2
         else:  # left rook
-            moved_piece.pos_x = x1 - 2
-            target.pos_x = x2 + 3
+            moved_piece.pos_x -= 2
+            target.pos_x += 3
 
         moved_piece.has_moved = True
         target.has_moved = True
-        self.tiles[y1][x1] = None
-        self.tiles[y2][x2] = None
-        self.tiles[y2][moved_piece.pos_x] = moved_piece
-        self.tiles[y2][target.pos_x] = target
-        self._clear_enpassants()
-
-    def _clear_enpassants(self):
-        for piece in self.enpassants:
-            piece.enpassant = None
-        self.enpassants = []
-
-    def _can_enpassant(self, moved_piece: Piece, x2: int, y2: int) -> bool:
-        return (
-            moved_piece.piece_type == PieceType.PAWN
-            and moved_piece.enpassant is not None
-            and moved_piece.enpassant == (x2, y2)
-        )
+        self.put_piece(moved_piece)
+        self.put_piece(target)
+        self.ep_square = None
+
+    def _can_enpassant(self, moved_piece: Piece, to: int) -> bool:
+        return moved_piece.type_index == bitboard.PAWN and to == self.ep_square
 
     def _can_castle(self, moved_piece: Piece, target: Piece) -> bool:
         return (
-            moved_piece.color == target.color
-            and moved_piece.piece_type == PieceType.KING
-            and target.piece_type == PieceType.ROOK
+            moved_piece.color_index == target.color_index
+            and moved_piece.type_index == bitboard.KING
+            and target.type_index == bitboard.ROOK
         )
 
     def _can_promote(self, moved_piece: Piece, y2: int) -> bool:
-        return moved_piece.piece_type == PieceType.PAWN and (
-            (y2 == 7 and moved_piece.color == PieceColor.BLACK)
-            or (y2 == 0 and moved_piece.color == PieceColor.WHITE)
+        return moved_piece.type_index == bitboard.PAWN and (
+            (y2 == 7 and moved_piece.color_index == bitboard.BLACK)
+            or (y2 == 0 and moved_piece.color_index == bitboard.WHITE)
         )
 
 
 def get_default_board() -> Board:
-    board = Board()
-    board.pieces_left.append(Piece(PieceType.ROOK, PieceColor.BLACK, board, 0, 0))
-    board.pieces_left.append(Piece(PieceType.KNIGHT, PieceColor.BLACK, board, 1, 0))
-    board.pieces_left.append(Piece(PieceType.BISHOP, PieceColor.BLACK, board, 2, 0))
-    board.pieces_left.append(Piece(PieceType.QUEEN, PieceColor.BLACK, board, 3, 0))
-    board.black_king = Piece(PieceType.KING, PieceColor.BLACK, board, 4, 0)
-    board.pieces_left.append(board.black_king)
-    board.pieces_left.append(Piece(PieceType.BISHOP, PieceColor.BLACK, board, 5, 0))
-    board.pieces_left.append(Piece(PieceType.KNIGHT, PieceColor.BLACK, board, 6, 0))
-    board.pieces_left.append(Piece(PieceType.ROOK, PieceColor.BLACK, board, 7, 0))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.BLACK, board, 0, 1))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.BLACK, board, 1, 1))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.BLACK, board, 2, 1))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.BLACK, board, 3, 1))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.BLACK, board, 4, 1))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.BLACK, board, 5, 1))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.BLACK, board, 6, 1))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.BLACK, board, 7, 1))
-    board.pieces_left.append(Piece(PieceType.ROOK, PieceColor.WHITE, board, 0, 7))
-    board.pieces_left.append(Piece(PieceType.KNIGHT, PieceColor.WHITE, board, 1, 7))
-    board.pieces_left.append(Piece(PieceType.BISHOP, PieceColor.WHITE, board, 2, 7))
-    board.pieces_left.append(Piece(PieceType.QUEEN, PieceColor.WHITE, board, 3, 7))
-    board.white_king = Piece(PieceType.KING, PieceColor.WHITE, board, 4, 7)
-    board.pieces_left.append(board.white_king)
-    board.pieces_left.append(Piece(PieceType.BISHOP, PieceColor.WHITE, board, 5, 7))
-    board.pieces_left.append(Piece(PieceType.KNIGHT, PieceColor.WHITE, board, 6, 7))
-    board.pieces_left.append(Piece(PieceType.ROOK, PieceColor.WHITE, board, 7, 7))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.WHITE, board, 0, 6))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.WHITE, board, 1, 6))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.WHITE, board, 2, 6))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.WHITE, board, 3, 6))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.WHITE, board, 4, 6))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.WHITE, board, 5, 6))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.WHITE, board, 6, 6))
-    board.pieces_left.append(Piece(PieceType.PAWN, PieceColor.WHITE, board, 7, 6))
-    return board
+    return Board.from_fen(START_FEN)
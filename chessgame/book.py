@@ -0,0 +1,129 @@
+import mmap
+import os
+import random
+import struct
+from collections import defaultdict
+from typing import Iterable, NamedTuple
+
+from . import bitboard
+from .board import Board
+from .pgn import PgnGame, parse_san, start_board
+from .piece import PieceColor
+from .transposition import pack_move, unpack_move
+
+# a header, then records sorted by key: position hash, packed move, weight
+MAGIC = b"CGBOOK1\n"
+RECORD = struct.Struct(">QHH")
+MAX_WEIGHT = 0xFFFF
+BOOK_PLIES = 24
+DEFAULT_BOOK = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "assets", "book.bin"
+)
+# what a game is worth to the moves of each side, like polyglot books
+RESULT_WEIGHTS = {
+    "1-0": {PieceColor.WHITE: 2, PieceColor.BLACK: 0},
+    "0-1": {PieceColor.WHITE: 0, PieceColor.BLACK: 2},
+    "1/2-1/2": {PieceColor.WHITE: 1, PieceColor.BLACK: 1},
+    "*": {PieceColor.WHITE: 1, PieceColor.BLACK: 1},
+}
+
+
+class BookMove(NamedTuple):
+    move: bitboard.Move
+    weight: int
+
+
+class OpeningBook:
+    # the file is mapped, not read, so opening costs the same for any size
+    # and a lookup only touches the pages its binary search lands on
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[: len(MAGIC)] != MAGIC:
+            self.data.close()
+            raise ValueError(f"{path} is not an opening book")
+        self.count = (len(self.data) - len(MAGIC)) // RECORD.size
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self) -> "OpeningBook":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_moves(self, key: int) -> list[BookMove]:
+        data = self.data
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if RECORD.unpack_from(data, len(MAGIC) + middle * RECORD.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        moves = []
+        for index in range(low, self.count):
+            record_key, packed, weight = RECORD.unpack_from(
+                data, len(MAGIC) + index * RECORD.size
+            )
+            if record_key != key:
+                break
+            move = unpack_move(packed)
+            assert move is not None
+            moves.append(BookMove(move, weight))
+        return moves
+
+    def choose_move(
+        self, board: Board, rng: random.Random | None = None
+    ) -> bitboard.Move | None:
+        moves = self.get_moves(board.hash)
+        if not moves:
+            return None
+        move = (random if rng is None else rng).choices(
+            [book_move.move for book_move in moves],
+            [book_move.weight for book_move in moves],
+        )[0]
+        # a hash collision or a book built by other rules must not play nonsense
+        return move if move in board.legal_moves() else None
+
+
+def open_book(path: str = DEFAULT_BOOK) -> OpeningBook | None:
+    return OpeningBook(path) if os.path.exists(path) else None
+
+
+def collect_moves(
+    games: Iterable[PgnGame], plies: int = BOOK_PLIES
+) -> dict[int, dict[int, int]]:
+    weights: dict[int, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    for game in games:
+        result = RESULT_WEIGHTS.get(game.result, RESULT_WEIGHTS["*"])
+        try:
+            board = start_board(game)
+        except ValueError:
+            continue
+        for san in game.moves[:plies]:
+            try:
+                move = parse_san(board, san)
+            except ValueError:
+                break  # keep what came before a broken move
+            weight = result[board.turn]
+            if weight:
+                weights[board.hash][pack_move(move)] += weight
+            board.make_move(move)
+    return weights
+
+
+def write_book(path: str, weights: dict[int, dict[int, int]]) -> int:
+    count = 0
+    with open(path, "wb") as file:
+        file.write(MAGIC)
+        for key in sorted(weights):
+            moves = weights[key]
+            # scaled per position, so popular lines keep their proportions
+            scale = max(1, -(-max(moves.values()) // MAX_WEIGHT))
+            for packed, weight in sorted(moves.items(), key=lambda item: -item[1]):
+                file.write(RECORD.pack(key, packed, max(1, weight // scale)))
+                count += 1
+    return count
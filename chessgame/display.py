@@ -1,10 +1,26 @@
+import os
+from collections import OrderedDict
+
 import pygame
 
-from .piece import Piece, PieceType, PieceColor, TILES_COUNT_X, TILES_COUNT_Y
+from .bitboard import PIECE_TYPES_COUNT
+from .piece import (
+    COLOR_INDEX,
+    TYPE_INDEX,
+    Piece,
+    PieceType,
+    PieceColor,
+    TILES_COUNT_X,
+    TILES_COUNT_Y,
+)
 from time import sleep
 
 WINDOW_WIDTH = 1280
 WINDOW_HEIGHT = 720
+TEXT_COLOR = (0, 0, 0)
+TEXT_CACHE_SIZE = 32
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+ATLAS_FILE = "atlas.png"  # used instead of the piece files when present
 
 PROMOTION_PIECE_TYPES = (
     PieceType.ROOK,
@@ -16,30 +32,125 @@ PROMOTION_PIECE_TYPES = (
 PIECE_TYPE_COUNT = len(PROMOTION_PIECE_TYPES)
 
 
-def _get_image(file_name: str) -> pygame.Surface:
-    return pygame.image.load(f"./chessgame/assets/{file_name}.png").convert_alpha()
+def _get_image(path: str) -> pygame.Surface:
+    return pygame.image.load(path).convert_alpha()
 
 
 IMAGES_PAIR_TYPE = dict[tuple[PieceColor, PieceType], pygame.Surface]
 
+_piece_images: IMAGES_PAIR_TYPE | None = None
 
-def get_image_dict() -> IMAGES_PAIR_TYPE:
+
+def get_piece_file_name(color: PieceColor, piece_type: PieceType) -> str:
+    return f"{color.name.lower()}_{piece_type.name.lower()}.png"
+
+
+def load_piece_images(directory: str = ASSETS_DIR) -> IMAGES_PAIR_TYPE:
+    atlas_path = os.path.join(directory, ATLAS_FILE)
+    if os.path.exists(atlas_path):
+        # one row per color and one column per bitboard piece type
+        atlas = _get_image(atlas_path)
+        width = atlas.get_width() // PIECE_TYPES_COUNT
+        height = atlas.get_height() // len(PieceColor)
+        return {
+            (color, piece_type): atlas.subsurface(
+                TYPE_INDEX[piece_type] * width,
+                COLOR_INDEX[color] * height,
+                width,
+                height,
+            )
+            for color in PieceColor
+            for piece_type in PieceType
+        }
     return {
-        (PieceColor.WHITE, PieceType.KING): _get_image("white_king"),
-        (PieceColor.WHITE, PieceType.KNIGHT): _get_image("white_knight"),
-        (PieceColor.WHITE, PieceType.BISHOP): _get_image("white_bishop"),
-        (PieceColor.WHITE, PieceType.PAWN): _get_image("white_pawn"),
-        (PieceColor.WHITE, PieceType.QUEEN): _get_image("white_queen"),
-        (PieceColor.WHITE, PieceType.ROOK): _get_image("white_rook"),
-        (PieceColor.BLACK, PieceType.KING): _get_image("black_king"),
-        (PieceColor.BLACK, PieceType.KNIGHT): _get_image("black_knight"),
-        (PieceColor.BLACK, PieceType.BISHOP): _get_image("black_bishop"),
-        (PieceColor.BLACK, PieceType.PAWN): _get_image("black_pawn"),
-        (PieceColor.BLACK, PieceType.QUEEN): _get_image("black_queen"),
-        (PieceColor.BLACK, PieceType.ROOK): _get_image("black_rook"),
+        (color, piece_type): _get_image(
+            os.path.join(directory, get_piece_file_name(color, piece_type))
+        )
+        for color in PieceColor
+        for piece_type in PieceType
     }
 
 
+def write_atlas(path: str, cell_size: int, directory: str = ASSETS_DIR):
+    # needs a display mode, like every other image load here
+    atlas = pygame.Surface(
+        (cell_size * PIECE_TYPES_COUNT, cell_size * len(PieceColor)), pygame.SRCALPHA
+    )
+    for color in PieceColor:
+        for piece_type in PieceType:
+            image = _get_image(
+                os.path.join(directory, get_piece_file_name(color, piece_type))
+            )
+            atlas.blit(
+                pygame.transform.smoothscale(image, (cell_size, cell_size)),
+                (TYPE_INDEX[piece_type] * cell_size, COLOR_INDEX[color] * cell_size),
+            )
+    pygame.image.save(atlas, path)
+
+
+def get_image_dict() -> IMAGES_PAIR_TYPE:
+    # loaded once per process and shared by every scene, lazily since images
+    # can only be converted once the window exists
+    global _piece_images
+    if _piece_images is None:
+        _piece_images = load_piece_images()
+    return _piece_images
+
+
+class SpriteCache:
+    # piece images scaled to the tile size, scaling is far slower than a blit
+    def __init__(self, images: IMAGES_PAIR_TYPE, smooth: bool = False) -> None:
+        self.images = images
+        self.smooth = smooth
+        self.size: tuple[int, int] | None = None
+        self.sprites: dict[
+            tuple[PieceColor, PieceType, tuple[int, int]], pygame.Surface
+        ] = {}
+
+    def get(
+        self, color: PieceColor, piece_type: PieceType, size: tuple[int, int]
+    ) -> pygame.Surface:
+        if size != self.size:  # the window was resized
+            self.sprites.clear()
+            self.size = size
+        key = (color, piece_type, size)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            scale = (
+                pygame.transform.smoothscale if self.smooth else pygame.transform.scale
+            )
+            sprite = scale(self.images[(color, piece_type)], size)
+            self.sprites[key] = sprite
+        return sprite
+
+
+class TextCache:
+    # fonts are slow to load and font.render is slow to run, while the scenes
+    # only ever show a handful of strings, the least recently used surface is
+    # dropped once there are more, like every second of a clock
+    def __init__(self, font_name: str, max_surfaces: int = TEXT_CACHE_SIZE) -> None:
+        self.font_name = font_name
+        self.max_surfaces = max_surfaces
+        self.fonts: dict[int, pygame.font.Font] = {}
+        self.surfaces: OrderedDict[tuple[int, str], pygame.Surface] = OrderedDict()
+
+    def render(self, text: str, size: int) -> pygame.Surface:
+        key = (size, text)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        font = self.fonts.get(size)
+        if font is None:
+            font = pygame.font.SysFont(self.font_name, size)
+            self.fonts[size] = font
+        surface = font.render(text, True, TEXT_COLOR)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
 def initialize() -> pygame.Surface:
     pygame.init()
     screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.RESIZABLE)
@@ -51,32 +162,34 @@ def render_pieces(
     screen: pygame.Surface,
     pieces: list[list[Piece | None]],
     pos_and_size: tuple[int, int, int, int],
-    images: IMAGES_PAIR_TYPE,
+    sprites: SpriteCache,
 ):
     for row in pieces:
         for piece in row:
-            if piece is None:
-                continue
-            screen.blit(
-                pygame.transform.scale(
-                    images[(piece.color, piece.piece_type)],
-                    (
-                        pos_and_size[2],
-                        pos_and_size[3],
-                    ),
-                ),
-                (
-                    pos_and_size[0] + piece.pos_x * pos_and_size[2],
-                    pos_and_size[1] + piece.pos_y * pos_and_size[3],
-                ),
-            )
+            if piece is not None:
+                render_piece(screen, piece, pos_and_size, sprites)
+
+
+def render_piece(
+    screen: pygame.Surface,
+    piece: Piece,
+    pos_and_size: tuple[int, int, int, int],
+    sprites: SpriteCache,
+):
+    screen.blit(
+        sprites.get(piece.color, piece.piece_type, (pos_and_size[2], pos_and_size[3])),
+        (
+            pos_and_size[0] + piece.pos_x * pos_and_size[2],
+            pos_and_size[1] + piece.pos_y * pos_and_size[3],
+        ),
+    )
 
 
 def render_promotion(
     screen: pygame.Surface,
     piece: Piece,
     pos_and_size: tuple[int, int, int, int],
-    images: IMAGES_PAIR_TYPE,
+    sprites: SpriteCache,
 ) -> tuple[float, float]:
     left = pos_and_size[0]
     top = pos_and_size[1]
@@ -96,12 +209,8 @@ def render_promotion(
     )
     for i in range(4):
         screen.blit(
-            pygame.transform.scale(
-                images[(piece.color, PROMOTION_PIECE_TYPES[i])],
-                (
-                    rect_width,
-                    rect_height,
-                ),
+            sprites.get(
+                piece.color, PROMOTION_PIECE_TYPES[i], (rect_width, rect_height)
             ),
             (
                 left + rect_width * (offset_x + i),
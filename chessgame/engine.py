@@ -0,0 +1,282 @@
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, NamedTuple
+
+from . import bitboard
+from .board import Board
+from .evaluation import evaluate
+from .tablebase import DRAW, get_plies
+from .transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+
+if TYPE_CHECKING:
+    from .book import OpeningBook
+    from .tablebase import Tablebase
+
+MATE = 100000
+MATE_BOUND = MATE - 1000
+INFINITY = MATE + 1
+MAX_DEPTH = 64
+CHECK_EVERY_NODES = 1024
+
+# indexed by bitboard piece type
+PIECE_VALUES = (100, 320, 330, 500, 900, 0)
+
+
+class SearchResult(NamedTuple):
+    move: bitboard.Move | None
+    score: int
+    depth: int
+    nodes: int
+    seconds: float
+    pv: list[bitboard.Move]
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+
+class SearchStopped(Exception):
+    pass
+
+
+def allocate_time(remaining: float, increment: float, moves_to_go: int = 30) -> float:
+    budget = remaining / moves_to_go + increment * 0.75
+    return max(0.05, min(budget, remaining * 0.5))
+
+
+class Engine:
+    def __init__(
+        self,
+        tt_megabytes: float = 16,
+        book: "OpeningBook | None" = None,
+        tablebase: "Tablebase | None" = None,
+    ) -> None:
+        self.tt = TranspositionTable(tt_megabytes)
+        self.book = book
+        self.tablebase = tablebase
+        self.nodes = 0
+        self.stop_time = float("inf")
+        self.stopped = False
+        self.root_moves: list[bitboard.Move] | None = None
+
+    def stop(self):
+        self.stopped = True
+
+    def search(
+        self,
+        board: Board,
+        max_depth: int = MAX_DEPTH,
+        time_limit: float | None = None,
+        on_iteration: Callable[[SearchResult], None] | None = None,
+        root_moves: list[bitboard.Move] | None = None,
+    ) -> SearchResult:
+        start = perf_counter()
+        self.nodes = 0
+        self.stopped = False
+        self.stop_time = float("inf") if time_limit is None else start + time_limit
+        self.root_moves = root_moves
+        self.tt.new_search()
+
+        if self.book is not None and root_moves is None:
+            book_move = self.book.choose_move(board)
+            if book_move is not None:  # depth 0 marks a move that was not searched
+                return SearchResult(
+                    book_move, 0, 0, 0, perf_counter() - start, [book_move]
+                )
+        if self.tablebase is not None and root_moves is None:
+            value = self.tablebase.probe(board)
+            tablebase_move = self.tablebase.get_best_move(board)
+            if value is not None and tablebase_move is not None:
+                return SearchResult(
+                    tablebase_move,
+                    _score_from_tablebase(value, 0),
+                    0,
+                    0,
+                    perf_counter() - start,
+                    [tablebase_move],
+                )
+
+        moves = board.legal_moves() if root_moves is None else root_moves
+        best = SearchResult(moves[0] if moves else None, 0, 0, 0, 0.0, [])
+        if not moves or (root_moves is None and len(moves) == 1):
+            return best
+        for depth in range(1, max_depth + 1):
+            try:
+                score = self._negamax(board, depth, -INFINITY, INFINITY, 0)
+            except SearchStopped:
+                break
+            pv = self._get_pv(board, depth)
+            best = SearchResult(
+                pv[0] if pv else best.move,
+                score,
+                depth,
+                self.nodes,
+                perf_counter() - start,
+                pv,
+            )
+            if on_iteration is not None:
+                on_iteration(best)
+            if abs(score) > MATE_BOUND:
+                break
+            # another iteration costs several times this one, do not start it late
+            if time_limit is not None and perf_counter() - start > time_limit / 2:
+                break
+        return best._replace(nodes=self.nodes, seconds=perf_counter() - start)
+
+    def _check_stop(self):
+        if self.stopped or perf_counter() > self.stop_time:
+            self.stopped = True
+            raise SearchStopped()
+
+    def _negamax(
+        self, board: Board, depth: int, alpha: int, beta: int, ply: int
+    ) -> int:
+        if depth <= 0:
+            return self._quiescence(board, alpha, beta, ply)
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY_NODES == 0:
+            self._check_stop()
+        # material only gets down to table size through a capture, which is
+        # also the only way the clock resets besides a pawn move
+        if ply > 0 and board.halfmove_clock == 0 and self.tablebase is not None:
+            value = self.tablebase.probe(board)
+            if value is not None:
+                return _score_from_tablebase(value, ply)
+
+        key = board.hash
+        entry = self.tt.probe(key)
+        hash_move = None
+        if entry is not None:
+            hash_move = entry.move
+            if ply > 0 and entry.depth >= depth:
+                score = _score_from_tt(entry.score, ply)
+                if entry.flag == EXACT:
+                    return score
+                if entry.flag == LOWER_BOUND and score >= beta:
+                    return score
+                if entry.flag == UPPER_BOUND and score <= alpha:
+                    return score
+
+        if ply == 0 and self.root_moves is not None:
+            moves = self.root_moves
+        else:
+            moves = board.legal_moves()
+        if not moves:
+            return -MATE + ply if board.is_in_check() else 0
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = None
+        for move in order_moves(board, moves, hash_move):
+            board.make_move(move)
+            try:
+                score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                board.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, _score_to_tt(best_score, ply), flag, best_move)
+        return best_score
+
+    def _quiescence(self, board: Board, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY_NODES == 0:
+            self._check_stop()
+        stand_pat = evaluate(board)
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        theirs = board.occupied[board.side ^ 1]
+        captures = [
+            move
+            for move in board.legal_moves()
+            if move[2] is not None or theirs & (1 << move[1])
+        ]
+        for move in order_moves(board, captures, None):
+            board.make_move(move)
+            try:
+                score = -self._quiescence(board, -beta, -alpha, ply + 1)
+            finally:
+                board.unmake_move()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    def _get_pv(self, board: Board, depth: int) -> list[bitboard.Move]:
+        pv: list[bitboard.Move] = []
+        for _ in range(depth):
+            entry = self.tt.probe(board.hash)
+            if entry is None or entry.move is None:
+                break
+            if entry.move not in board.legal_moves():
+                break
+            pv.append(entry.move)
+            board.make_move(entry.move)
+        for _ in pv:
+            board.unmake_move()
+        return pv
+
+
+def order_moves(
+    board: Board, moves: list[bitboard.Move], hash_move: bitboard.Move | None
+) -> list[bitboard.Move]:
+    squares = board.squares
+
+    def move_order(move: bitboard.Move) -> int:
+        if move == hash_move:
+            return -INFINITY
+        from_sq, to, promotion = move
+        score = 0
+        victim = squares[to]
+        if victim:
+            types = bitboard.PIECE_TYPES_COUNT
+            victim_color, victim_type = divmod(victim - 1, types)
+            attacker_color, attacker_type = divmod(squares[from_sq] - 1, types)
+            if victim_color == attacker_color:  # castling
+                return 0
+            # most valuable victim first, least valuable attacker breaks ties
+            score -= 10 * PIECE_VALUES[victim_type]
+            score += PIECE_VALUES[attacker_type] // 100
+        if promotion is not None:
+            score -= PIECE_VALUES[promotion]
+        return score
+
+    return sorted(moves, key=move_order)
+
+
+def _score_from_tablebase(value: int, ply: int) -> int:
+    if value == DRAW:
+        return 0
+    if value > 0:
+        return MATE - ply - get_plies(value)
+    return -MATE + ply + get_plies(value)
+
+
+def _score_to_tt(score: int, ply: int) -> int:
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score: int, ply: int) -> int:
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
@@ -10,22 +10,77 @@ from .display import (
     PROMOTION_PIECE_TYPES,
 )
 from .piece import Piece, PieceColor
+from .profiler import FrameProfiler
+from . import profiler
 from .scene import Scene, MenuScene, GameScene
 from time import perf_counter
 
 MIN_WIDTH = 640
 MIN_HEIGHT = 480
 FPS = 30
+IDLE_WAKE_MS = 1000  # an idle scene still wakes this often to tick the clocks
+OVERLAY_KEY = pygame.K_F3
 
 
-def run(screen: pygame.Surface):
+def run(
+    screen: pygame.Surface,
+    scene: Scene | None = None,
+    frame_profiler: FrameProfiler | None = None,
+    show_overlay: bool = False,
+    max_frames: int | None = None,
+):
+    if frame_profiler is None:
+        frame_profiler = FrameProfiler()
+    frame_profiler.start()
+    try:
+        _run(screen, scene, frame_profiler, show_overlay, max_frames)
+    finally:
+        frame_profiler.stop()
+
+
+def _run(
+    screen: pygame.Surface,
+    scene: Scene | None,
+    frame_profiler: FrameProfiler,
+    show_overlay: bool,
+    max_frames: int | None,
+):
     clock = pygame.time.Clock()
-    scene = MenuScene()
+    if scene is None:
+        scene = MenuScene()
     start_time = perf_counter()
     delta_time = 0
+    pygame.event.set_blocked(pygame.MOUSEMOTION)  # nothing reacts to hovering
     while True:
-        scene.on_loop(screen,delta_time)
-        for event in pygame.event.get():
+        next_scene = scene.on_loop(screen, delta_time)
+        profiler.lap("scene")
+        if next_scene is not None:
+            scene = next_scene
+            # the new scene starts its clock now, not with the old frame's time
+            start_time = perf_counter()
+            delta_time = 0
+            continue  # let the new scene draw before it gets any clicks
+        dirty_rects = scene.dirty_rects
+        if show_overlay:
+            overlay_rect = frame_profiler.draw(screen)
+            if dirty_rects is not None:
+                dirty_rects = dirty_rects + [overlay_rect]
+            profiler.lap("overlays")
+        if dirty_rects is None:
+            pygame.display.update()
+        elif dirty_rects:
+            pygame.display.update(dirty_rects)
+        profiler.lap("update")
+        # a fixed number of frames or live numbers mean measuring frames, so
+        # only sleep when nobody is watching the frame rate
+        if scene.is_idle() and not show_overlay and max_frames is None:
+            # nothing moves until the player does, so sleep instead of spinning
+            events = [pygame.event.wait(IDLE_WAKE_MS)] + pygame.event.get()
+        else:
+            clock.tick(FPS)
+            events = pygame.event.get()
+        profiler.lap("idle")
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 return
@@ -36,12 +91,24 @@ def run(screen: pygame.Surface):
                 if height < MIN_HEIGHT:
                     height = MIN_HEIGHT
                 screen = pygame.display.set_mode((width, height), pygame.RESIZABLE)
+                scene.invalidate()
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                scene.invalidate()
+            elif event.type == pygame.KEYDOWN and event.key == OVERLAY_KEY:
+                show_overlay = not show_overlay
+                scene.invalidate()
             elif event.type == pygame.MOUSEBUTTONDOWN:
+                profiler.lap("events")
                 event_check = scene.on_click(delta_time)
+                profiler.lap("on_click")
                 if event_check is not None:
                     scene = event_check
-        pygame.display.update()
-        clock.tick(FPS)
+                    start_time = perf_counter()
+        profiler.lap("events")
+        frame_profiler.end_frame()
+        if max_frames is not None and frame_profiler.frame >= max_frames:
+            pygame.quit()
+            return
         time_now = perf_counter()
         delta_time = time_now - start_time
         start_time = time_now
@@ -0,0 +1,103 @@
+import importlib
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Iterable
+
+# what every move ends up running many times, as module:attribute
+HOT_PATHS = (
+    "chessgame.bitboard:attackers_to",
+    "chessgame.bitboard:generate_legal_moves",
+    "chessgame.board:Board.legal_moves",
+    "chessgame.board:Board.make_move",
+    "chessgame.board:Board.unmake_move",
+)
+# only worth registering for a workload that searches
+ENGINE_PATHS = (
+    "chessgame.engine:Engine._negamax",
+    "chessgame.engine:Engine._quiescence",
+    "chessgame.engine:order_moves",
+)
+# what GameScene runs after every move, resolving the scene imports pygame
+GAME_PATHS = (
+    "chessgame.scene:get_legal_move_map",
+    "chessgame.board:Board.get_draw_reason",
+)
+
+
+class Stat:
+    __slots__ = ("calls", "seconds")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0  # includes whatever the function called
+
+
+def _resolve(target: str) -> tuple[Any, str]:
+    module_name, _, path = target.partition(":")
+    owner: Any = importlib.import_module(module_name)
+    *owners, name = path.split(".")
+    for attribute in owners:
+        owner = getattr(owner, attribute)
+    return owner, name
+
+
+# the targets are only wrapped while the registry is enabled, a disabled one
+# leaves the original functions in place and so costs nothing
+class Registry:
+    def __init__(self, targets: Iterable[str] = HOT_PATHS) -> None:
+        self.targets = tuple(targets)
+        self.stats: dict[str, Stat] = {target: Stat() for target in self.targets}
+        self._originals: list[tuple[Any, str, Callable]] = []
+
+    def enable(self):
+        if self._originals:
+            return
+        for target in self.targets:
+            owner, name = _resolve(target)
+            original = getattr(owner, name)
+            self._originals.append((owner, name, original))
+            setattr(owner, name, self._wrap(original, self.stats[target]))
+
+    def disable(self):
+        while self._originals:
+            owner, name, original = self._originals.pop()
+            setattr(owner, name, original)
+
+    def reset(self):
+        for stat in self.stats.values():
+            stat.calls = 0
+            stat.seconds = 0.0
+
+    def __enter__(self) -> "Registry":
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    @staticmethod
+    def _wrap(function: Callable, stat: Stat) -> Callable:
+        @wraps(function)
+        def counted(*args, **kwargs):
+            stat.calls += 1
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stat.seconds += perf_counter() - start
+
+        return counted
+
+    def get_lines(self, actions: int = 1) -> list[str]:
+        lines = [
+            f"{'function':<42} {'calls':>9} {'per action':>11} "
+            f"{'total ms':>10} {'ms/action':>10}"
+        ]
+        for target, stat in sorted(
+            self.stats.items(), key=lambda item: item[1].seconds, reverse=True
+        ):
+            lines.append(
+                f"{target:<42} {stat.calls:>9} {stat.calls / actions:>11.1f} "
+                f"{stat.seconds * 1000:>10.2f} {stat.seconds * 1000 / actions:>10.3f}"
+            )
+        return lines
@@ -0,0 +1,91 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+from . import bitboard
+from .board import Board
+from .engine import MATE_BOUND, MAX_DEPTH, Engine, SearchResult, order_moves
+
+_engine: Engine | None = None
+
+
+def _init_worker(tt_megabytes: float):
+    # every process keeps its own table between searches
+    global _engine
+    _engine = Engine(tt_megabytes)
+
+
+def _search_root_moves(
+    board: Board,
+    root_moves: list[bitboard.Move],
+    max_depth: int,
+    time_limit: float | None,
+) -> tuple[list[SearchResult], int]:
+    # every finished depth goes back, so shares can be compared at one depth
+    assert _engine is not None
+    iterations: list[SearchResult] = []
+    result = _engine.search(
+        board, max_depth, time_limit, iterations.append, root_moves=root_moves
+    )
+    return iterations, result.nodes
+
+
+def _get_common_depth(searched: list[list[SearchResult]]) -> int:
+    # a share that found a mate stops early, its score holds at any depth
+    depths = [
+        len(iterations)
+        for iterations in searched
+        if not iterations or abs(iterations[-1].score) <= MATE_BOUND
+    ]
+    if depths:
+        return min(depths)
+    return max(len(iterations) for iterations in searched)
+
+
+class ParallelEngine:
+    # splits the root moves between worker processes, each one searches its
+    # share with its own transposition table and the best score at the
+    # deepest depth every share finished wins
+    def __init__(self, workers: int | None = None, tt_megabytes: float = 16) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(
+            self.workers, initializer=_init_worker, initargs=(tt_megabytes,)
+        )
+
+    def search(
+        self,
+        board: Board,
+        max_depth: int = MAX_DEPTH,
+        time_limit: float | None = None,
+    ) -> SearchResult:
+        start = perf_counter()
+        moves = order_moves(board, board.legal_moves(), None)
+        if len(moves) <= 1:
+            return SearchResult(moves[0] if moves else None, 0, 0, 0, 0.0, [])
+        # dealt round robin so the likely best captures land on different workers
+        shares = [moves[i :: self.workers] for i in range(self.workers)]
+        futures = [
+            self.pool.submit(_search_root_moves, board, share, max_depth, time_limit)
+            for share in shares
+            if share
+        ]
+        results = [future.result() for future in futures]
+        nodes = sum(result_nodes for _, result_nodes in results)
+        searched = [iterations for iterations, _ in results]
+        depth = _get_common_depth(searched)
+        if depth == 0:  # some share never finished a depth
+            return SearchResult(moves[0], 0, 0, nodes, perf_counter() - start, [])
+        best = max(
+            (iterations[min(depth, len(iterations)) - 1] for iterations in searched),
+            key=lambda result: result.score,
+        )
+        return best._replace(depth=depth, nodes=nodes, seconds=perf_counter() - start)
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> "ParallelEngine":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -0,0 +1,129 @@
+from time import perf_counter
+from typing import NamedTuple
+
+from . import bitboard, evaluation, zobrist
+from .board import START_FEN, Board
+
+
+class PerftPosition(NamedTuple):
+    name: str
+    fen: str
+    nodes: tuple[int, ...]  # expected leaf count for depth 1, 2, ...
+
+
+# https://www.chessprogramming.org/Perft_Results
+POSITIONS = (
+    PerftPosition("start", START_FEN, (20, 400, 8902, 197281, 4865609)),
+    PerftPosition(
+        "kiwipete",
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        (48, 2039, 97862, 4085603),
+    ),
+    PerftPosition(
+        "endgame",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        (14, 191, 2812, 43238, 674624),
+    ),
+    PerftPosition(
+        "promotions",
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        (6, 264, 9467, 422333),
+    ),
+    PerftPosition(
+        "discovered checks",
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        (44, 1486, 62379, 2103487),
+    ),
+    PerftPosition(
+        "middlegame",
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        (46, 2079, 89890, 3894594),
+    ),
+)
+
+
+def move_name(move: bitboard.Move) -> str:
+    # castling is written as the king taking its own rook, like the GUI does
+    from_sq, to, promotion = move
+    name = bitboard.square_name(from_sq) + bitboard.square_name(to)
+    if promotion is not None:
+        name += "pnbrqk"[promotion]
+    return name
+
+
+def perft(board: Board, depth: int) -> int:
+    moves = board.legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        board.make_move(move)
+        nodes += perft(board, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+def verify(board: Board, depth: int) -> int:
+    # perft that recomputes what make_move and unmake_move keep up to date
+    # at every node, slow but it points at the first position that drifts
+    _check_state(board)
+    if depth <= 0:
+        return 1
+    nodes = 0
+    for move in board.legal_moves():
+        board.make_move(move)
+        nodes += verify(board, depth - 1)
+        board.unmake_move()
+        _check_state(board)
+    return nodes
+
+
+def _check_state(board: Board):
+    if board.hash != zobrist.compute_hash(board):
+        raise ValueError(f"incremental hash is off in {board.to_fen()}")
+    scores = (board.mg_score, board.eg_score, board.phase)
+    if scores != evaluation.compute_scores(board):
+        raise ValueError(f"incremental scores are off in {board.to_fen()}")
+
+
+def divide(board: Board, depth: int) -> list[tuple[bitboard.Move, int]]:
+    result = []
+    for move in board.legal_moves():
+        board.make_move(move)
+        result.append((move, perft(board, depth - 1)))
+        board.unmake_move()
+    return result
+
+
+class PerftResult(NamedTuple):
+    name: str
+    depth: int
+    nodes: int
+    expected: int | None
+    seconds: float
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def passed(self) -> bool:
+        return self.expected is None or self.expected == self.nodes
+
+
+def run_position(
+    position: PerftPosition, depth: int, check: bool = False
+) -> PerftResult:
+    board = Board.from_fen(position.fen)
+    start = perf_counter()
+    nodes = verify(board, depth) if check else perft(board, depth)
+    seconds = perf_counter() - start
+    expected = position.nodes[depth - 1] if depth <= len(position.nodes) else None
+    return PerftResult(position.name, depth, nodes, expected, seconds)
+
+
+def run_suite(max_depth: int, check: bool = False) -> list[PerftResult]:
+    return [
+        run_position(position, min(max_depth, len(position.nodes)), check)
+        for position in POSITIONS
+    ]
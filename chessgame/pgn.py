@@ -0,0 +1,226 @@
+import re
+from typing import Iterable, Iterator, NamedTuple, TextIO
+
+from . import bitboard
+from .board import START_FEN, Board
+
+# indexed by bitboard piece type, pawns have no letter in SAN
+SAN_PIECES = "PNBRQK"
+SAN_PATTERN = re.compile(r"([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?")
+CASTLING_SAN = {"O-O": True, "0-0": True, "O-O-O": False, "0-0-0": False}
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+SEVEN_TAG_ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+HEADER_PATTERN = re.compile(r'\[(\w+)\s+"(.*)"\]')
+TOKEN_PATTERN = re.compile(r"\{[^}]*\}?|;.*|\(|\)|\$\d+|[^\s{}();]+")
+MOVE_NUMBER_PATTERN = re.compile(r"^\d+\.*")
+LINE_WIDTH = 80
+
+
+class PgnGame(NamedTuple):
+    headers: dict[str, str]
+    moves: list[str]  # SAN
+    result: str
+
+
+def move_to_san(board: Board, move: bitboard.Move) -> str:
+    from_sq, to, promotion = move
+    squares = board.squares
+    color, piece_type = divmod(squares[from_sq] - 1, bitboard.PIECE_TYPES_COUNT)
+    target = squares[to]
+    if target and (target - 1) // bitboard.PIECE_TYPES_COUNT == color:
+        san = "O-O" if to > from_sq else "O-O-O"  # the king takes its own rook
+    else:
+        capture = target != 0 or (piece_type == bitboard.PAWN and to == board.ep_square)
+        if piece_type == bitboard.PAWN:
+            san = bitboard.square_name(from_sq)[0] + "x" if capture else ""
+        else:
+            san = SAN_PIECES[piece_type] + _disambiguation(board, move, color)
+            if capture:
+                san += "x"
+        san += bitboard.square_name(to)
+        if promotion is not None:
+            san += "=" + SAN_PIECES[promotion]
+
+    board.make_move(move)
+    if board.is_in_check():
+        san += "+" if board.legal_moves() else "#"
+    board.unmake_move()
+    return san
+
+
+def _disambiguation(board: Board, move: bitboard.Move, color: int) -> str:
+    from_sq, to, _ = move
+    index = board.squares[from_sq] - 1
+    others = board.bitboards[index] & ~(1 << from_sq)
+    if not others:
+        return ""
+    rivals = [
+        other
+        for other, other_to, _ in bitboard.generate_legal_moves(board, color, others)
+        if other_to == to
+    ]
+    if not rivals:
+        return ""
+    name = bitboard.square_name(from_sq)
+    if all(other & 7 != from_sq & 7 for other in rivals):
+        return name[0]
+    if all(other >> 3 != from_sq >> 3 for other in rivals):
+        return name[1]
+    return name
+
+
+def parse_san(board: Board, san: str) -> bitboard.Move:
+    text = san.rstrip("+#!?")
+    color = board.side
+    base = color * bitboard.PIECE_TYPES_COUNT
+    ours = board.occupied[color]
+
+    if text in CASTLING_SAN:
+        kingside = CASTLING_SAN[text]
+        king = board.bitboards[base + bitboard.KING]
+        for move in bitboard.generate_legal_moves(board, color, king):
+            from_sq, to, _ = move
+            if ours & (1 << to) and (to > from_sq) == kingside:
+                return move
+        raise ValueError(f"illegal move {san} in {board.to_fen()}")
+
+    match = SAN_PATTERN.fullmatch(text)
+    if match is None:
+        raise ValueError(f"invalid move {san}")
+    piece, file, rank, square, promotion = match.groups()
+    piece_type = bitboard.PAWN if piece is None else SAN_PIECES.index(piece)
+    to = bitboard.parse_square(square)
+    promotion_type = None if promotion is None else SAN_PIECES.index(promotion)
+    candidates = [
+        move
+        for move in bitboard.generate_legal_moves(
+            board, color, board.bitboards[base + piece_type]
+        )
+        if move[1] == to
+        and move[2] == promotion_type
+        and (file is None or "abcdefgh"[move[0] & 7] == file)
+        and (rank is None or str(8 - (move[0] >> 3)) == rank)
+    ]
+    if len(candidates) != 1 or ours & (1 << to):
+        raise ValueError(f"illegal move {san} in {board.to_fen()}")
+    return candidates[0]
+
+
+def read_games(lines: Iterable[str]) -> Iterator[PgnGame]:
+    # one game at a time, so archives never have to fit in memory
+    headers: dict[str, str] = {}
+    moves: list[str] = []
+    in_comment = False
+    variation_depth = 0
+    for line in lines:
+        if in_comment:
+            end = line.find("}")
+            if end < 0:
+                continue
+            line = line[end + 1 :]
+            in_comment = False
+        stripped = line.strip()
+        if not stripped or stripped.startswith("%"):
+            continue
+        if stripped.startswith("[") and variation_depth == 0:
+            header = HEADER_PATTERN.match(stripped)
+            if header is not None:
+                if moves:  # the last game had no result
+                    yield PgnGame(headers, moves, headers.get("Result", "*"))
+                    headers, moves = {}, []
+                headers[header.group(1)] = _unescape(header.group(2))
+                continue
+
+        for token in TOKEN_PATTERN.findall(stripped):
+            if token[0] == "{":
+                in_comment = not token.endswith("}")
+            elif token[0] == ";":
+                break
+            elif token == "(":
+                variation_depth += 1
+            elif token == ")":
+                variation_depth -= 1
+            elif variation_depth > 0 or token[0] == "$":
+                continue
+            elif token in RESULTS:
+                yield PgnGame(headers, moves, token)
+                headers, moves = {}, []
+            else:
+                token = MOVE_NUMBER_PATTERN.sub("", token)
+                if token:
+                    moves.append(token)
+    if headers or moves:
+        yield PgnGame(headers, moves, headers.get("Result", "*"))
+
+
+def start_board(game: PgnGame) -> Board:
+    return Board.from_fen(game.headers.get("FEN", START_FEN))
+
+
+def replay_game(game: PgnGame) -> Board:
+    board = start_board(game)
+    for san in game.moves:
+        board.make_move(parse_san(board, san))
+    return board
+
+
+def game_from_board(board: Board, headers: dict[str, str], result: str) -> PgnGame:
+    start = board.copy()
+    while start.history:
+        start.unmake_move()
+    headers = dict(headers)
+    fen = start.to_fen()
+    if fen != START_FEN:
+        headers["SetUp"] = "1"
+        headers["FEN"] = fen
+    moves = []
+    for undo in board.history:
+        moves.append(move_to_san(start, undo.move))
+        start.make_move(undo.move)
+    return PgnGame(headers, moves, result)
+
+
+def format_game(game: PgnGame) -> str:
+    headers = {name: game.headers.get(name, "?") for name in SEVEN_TAG_ROSTER}
+    headers.update(game.headers)
+    headers["Result"] = game.result
+    lines = [f'[{name} "{_escape(value)}"]' for name, value in headers.items()]
+    lines.append("")
+
+    fields = game.headers.get("FEN", START_FEN).split()
+    white_to_move = fields[1] == "w"
+    number = int(fields[5]) if len(fields) > 5 else 1
+    tokens = []
+    for san in game.moves:
+        if white_to_move:
+            tokens.append(f"{number}.")
+        elif not tokens:
+            tokens.append(f"{number}...")
+        tokens.append(san)
+        if not white_to_move:
+            number += 1
+        white_to_move = not white_to_move
+    tokens.append(game.result)
+
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > LINE_WIDTH:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    return "\n".join(lines) + "\n\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", r"\1", value)
+
+
+def write_game(stream: TextIO, game: PgnGame):
+    stream.write(format_game(game))
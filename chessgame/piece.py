@@ -1,6 +1,6 @@
 from enum import Enum, auto
-from typing import TYPE_CHECKING, Iterable
-from itertools import repeat
+from typing import TYPE_CHECKING
+from . import bitboard
 
 if TYPE_CHECKING:
     from .board import Board
@@ -9,44 +9,19 @@ TILES_COUNT_X = 8
 TILES_COUNT_Y = 8
 
 
-def get_nsew():
-    return (
-        zip(repeat(0), range(-1, -TILES_COUNT_Y, -1)),  # north
-        zip(repeat(0), range(1, TILES_COUNT_Y)),  # south
-        zip(range(1, TILES_COUNT_X), repeat(0)),  # east
-        zip(range(-1, -TILES_COUNT_X, -1), repeat(0)),  # west
-    )
-
-
-def get_diagonals():
-    return (
-        zip(range(1, TILES_COUNT_X), range(-1, -TILES_COUNT_Y, -1)),  # north east
-        zip(range(1, TILES_COUNT_X), range(1, TILES_COUNT_Y)),  # south east
-        zip(range(-1, -TILES_COUNT_X, -1), range(-1, -TILES_COUNT_Y, -1)),  # north west
-        zip(range(-1, -TILES_COUNT_X, -1), range(1, TILES_COUNT_Y)),  # south west)
-    )
-
-
-def king_castle_tiles():
-    return (
-        zip(range(1, TILES_COUNT_X), repeat(0)),  # east
-        zip(range(-1, -TILES_COUNT_X, -1), repeat(0)),  # west
+class Piece:
+    __slots__ = (
+        "piece_type",
+        "color",
+        "type_index",  # the bitboard piece type and color of the two above
+        "color_index",
+        "board",
+        "pos_x",
+        "pos_y",
+        "has_moved",
+        "list_index",
     )
 
-
-KNIGHT_OFFSETS = (
-    (-2, -1),
-    (-1, -2),
-    (1, -2),
-    (2, -1),
-    (2, 1),
-    (1, 2),
-    (-1, 2),
-    (-2, 1),
-)
-
-
-class Piece:
     def __init__(
         self,
         piece_type: "PieceType",
@@ -57,179 +32,60 @@ class Piece:
     ) -> None:
         self.piece_type = piece_type
         self.color = color
+        self.type_index = TYPE_INDEX[piece_type]
+        self.color_index = COLOR_INDEX[color]
         self.board = board
         self.pos_x = x
         self.pos_y = y
         self.has_moved = False
-        self.enpassant: tuple[int, int] | None = None
-        self.is_invis = False
-        board.tiles[y][x] = self
+        self.list_index = -1  # position in board.pieces, set by add_piece
+        board.put_piece(self)
+        board.add_piece(self)
+
+    @classmethod
+    def from_index(
+        cls, index: int, board: "Board", x: int, y: int, has_moved: bool
+    ) -> "Piece":
+        # for a piece the board already has on its bitboards, it is not put
+        piece = cls.__new__(cls)
+        piece.color_index, piece.type_index = divmod(index, bitboard.PIECE_TYPES_COUNT)
+        piece.piece_type = TYPES[piece.type_index]
+        piece.color = COLORS[piece.color_index]
+        piece.board = board
+        piece.pos_x = x
+        piece.pos_y = y
+        piece.has_moved = has_moved
+        piece.list_index = -1
+        return piece
+
+    def copy(self, board: "Board") -> "Piece":
+        # the copy is not put on the board, the caller places it
+        piece = Piece.__new__(Piece)
+        piece.piece_type = self.piece_type
+        piece.color = self.color
+        piece.type_index = self.type_index
+        piece.color_index = self.color_index
+        piece.board = board
+        piece.pos_x = self.pos_x
+        piece.pos_y = self.pos_y
+        piece.has_moved = self.has_moved
+        piece.list_index = self.list_index
+        return piece
+
+    def set_type(self, type_index: int):
+        self.type_index = type_index
+        self.piece_type = TYPES[type_index]
 
     def available_moves(self) -> list[tuple[int, int]]:
-        possible_tiles: list[tuple[int, int]] = []
-        is_checked = self.is_king_attacked()
-
-        if self.piece_type == PieceType.KING:
-            if not self.has_moved and not is_checked:  # castle
-                for direction in king_castle_tiles():
-                    for offset_x, offset_y in direction:
-                        x = self.pos_x + offset_x
-                        y = self.pos_y
-                        if not self.board.is_in_bound(x, y):
-                            break
-                        same_row = self.board.get_piece(x, y)
-                        if same_row is None:
-                            continue
-                        if (
-                            self.is_any_piece(x, y)
-                            and same_row.piece_type != PieceType.ROOK
-                        ):
-                            break
-                        if offset_x in range(-2, 2) and self.is_coord_attacked(x, y):
-                            break
-                        if (
-                            same_row.piece_type == PieceType.ROOK
-                            and not same_row.has_moved
-                        ):
-                            possible_tiles.append((x, y))
-            for offset_x in range(-1, 2):
-                for offset_y in range(-1, 2):
-                    if offset_x == 0 and offset_y == 0:
-                        continue
-                    x = self.pos_x + offset_x
-                    y = self.pos_y + offset_y
-                    if not self.board.is_in_bound(x, y):
-                        continue
-                    if self.is_ally(x, y):
-                        continue
-                    if self.is_coord_attacked(x, y):
-                        continue
-                    possible_tiles.append((x, y))
-            if not is_checked:
-                return possible_tiles
-            new_possible_tile: list[tuple[int, int]] = []
-            self.board.tiles[self.pos_y][self.pos_x] = None
-            old_pos_x = self.pos_x
-            old_pos_y = self.pos_y
-            for possible_tile in possible_tiles:
-                self.pos_x = possible_tile[0]
-                self.pos_y = possible_tile[1]
-                old_piece = self.board.get_piece(possible_tile[0], possible_tile[1])
-                self.board.tiles[possible_tile[1]][possible_tile[0]] = self
-                if not self.is_king_attacked():
-                    new_possible_tile.append(possible_tile)
-                self.board.tiles[possible_tile[1]][possible_tile[0]] = old_piece
-            self.pos_x = old_pos_x
-            self.pos_y = old_pos_y
-            self.board.tiles[self.pos_y][self.pos_x] = self
-            return new_possible_tile
-
-        match self.piece_type:
-            case PieceType.ROOK:
-                for direction in get_nsew():
-                    self.__legit_moves(direction, possible_tiles)
-
-            case PieceType.QUEEN:
-                for direction in (*get_diagonals(), *get_nsew()):
-                    self.__legit_moves(direction, possible_tiles)
-
-            case PieceType.BISHOP:
-                for direction in get_diagonals():
-                    self.__legit_moves(direction, possible_tiles)
-
-            case PieceType.KNIGHT:
-                for offset_x, offset_y in KNIGHT_OFFSETS:
-                    x = self.pos_x + offset_x
-                    y = self.pos_y + offset_y
-                    if not self.board.is_in_bound(x, y):
-                        continue
-                    if self.is_ally(x, y):
-                        continue
-                    possible_tiles.append((x, y))
-
-            case PieceType.PAWN:
-                if self.color == PieceColor.WHITE:
-                    direction = 1
-                elif self.color == PieceColor.BLACK:
-                    direction = -1
-
-                if self.enpassant is not None:
-                    possible_tiles.append(self.enpassant)
-
-                for x, y in (
-                    (self.pos_x - 1, self.pos_y - direction),
-                    (self.pos_x + 1, self.pos_y - direction),
-                ):
-                    if not self.board.is_in_bound(x, y):
-                        continue
-                    if self.is_enemy(x, y):
-                        possible_tiles.append((x, y))
-
-                for offset_y in range(1, 2 if self.has_moved else 3):
-                    x = self.pos_x
-                    y = self.pos_y - offset_y * direction
-                    if not self.board.is_in_bound(x, y):
-                        continue
-                    if self.is_any_piece(x, y):
-                        break
-                    possible_tiles.append((x, y))
-
-        if not is_checked and self.is_pinned():
-            self.is_invis = True
-            for x, y in possible_tiles:
-                checking_piece = self.board.get_piece(x, y)
-                if checking_piece is None:
-                    continue
-                if checking_piece.color == self.color:
-                    continue
-                elif checking_piece.color != self.color:
-                    checking_piece.is_invis = True
-                    if self.is_king_attacked():
-                        checking_piece.is_invis = False
-                        continue
-                    else:
-                        checking_piece.is_invis = False
-                        self.is_invis = False
-                        tiles = []
-                        tiles_x = []
-                        tiles_y = []
-                        if self.pos_x > checking_piece.pos_x:
-                            for x in range(
-                                self.pos_x - 1, checking_piece.pos_x - 1, -1
-                            ):
-                                tiles_x.append(x)
-                        elif self.pos_x < checking_piece.pos_x:
-                            for x in range(self.pos_x + 1, checking_piece.pos_x + 1, 1):
-                                tiles_x.append(x)
-                        else:
-                            tiles_x.append(x)
-
-                        if self.pos_y > checking_piece.pos_y:
-                            for y in range(
-                                self.pos_y - 1, checking_piece.pos_y - 1, -1
-                            ):
-                                tiles_y.append(y)
-                        elif self.pos_y < checking_piece.pos_y:
-                            for y in range(self.pos_y + 1, checking_piece.pos_y + 1, 1):
-                                tiles_y.append(y)
-                        else:
-                            tiles_y.append(y)
-                        for x in tiles_x:
-                            for y in tiles_y:
-                                tiles.append((x, y))
-                        return [(x, y) for x, y in tiles]
-            self.is_invis = False
-            return []
-        if not is_checked:
-            return possible_tiles
-        new_possible_tile: list[tuple[int, int]] = []
-        for possible_tile in possible_tiles:
-            old_piece = self.board.get_piece(possible_tile[0], possible_tile[1])
-            self.board.tiles[possible_tile[1]][possible_tile[0]] = self
-            if not self.is_king_attacked():
-                new_possible_tile.append(possible_tile)
-            self.board.tiles[possible_tile[1]][possible_tile[0]] = old_piece
-        return new_possible_tile
+        # the four promotions land on the same square, keep one of them
+        origin = bitboard.square(self.pos_x, self.pos_y)
+        return [
+            bitboard.coords(target)
+            for _, target, promotion in bitboard.generate_legal_moves(
+                self.board, self.color_index, 1 << origin
+            )
+            if promotion is None or promotion == bitboard.QUEEN
+        ]
 
     def is_ally(self, x: int, y: int) -> bool:
         them = self.board.get_piece(x, y)
@@ -246,106 +102,13 @@ class Piece:
     def is_any_piece(self, x: int, y: int) -> bool:
         return self.board.get_piece(x, y) is not None
 
-    def __legit_moves(
-        self,
-        direction: Iterable[tuple[int, int]],
-        possible_tiles: list[tuple[int, int]],
-    ):
-        for offset_x, offset_y in direction:
-            x = self.pos_x + offset_x
-            y = self.pos_y + offset_y
-            if not self.board.is_in_bound(x, y):
-                break
-            if self.is_ally(x, y):
-                break
-            possible_tiles.append((x, y))
-            if self.is_enemy(x, y):
-                break
-
     def is_coord_attacked(self, x: int, y: int) -> bool:
-        for direction in get_nsew():
-            for offset_x, offset_y in direction:
-                if not self.board.is_in_bound(x + offset_x, y + offset_y):
-                    break
-                selected_piece = self.board.get_piece(x + offset_x, y + offset_y)
-                if selected_piece is None or selected_piece.is_invis:
-                    continue
-                if selected_piece.color == self.color:
-                    break
-                if selected_piece.piece_type in (PieceType.ROOK, PieceType.QUEEN):
-                    return True
-                break
-        for direction in get_diagonals():
-            for offset_x, offset_y in direction:
-                if not self.board.is_in_bound(x + offset_x, y + offset_y):
-                    break
-                selected_piece = self.board.get_piece(x + offset_x, y + offset_y)
-                if selected_piece is None or selected_piece.is_invis:
-                    continue
-                if selected_piece.color == self.color:
-                    break
-                if selected_piece.piece_type in (PieceType.BISHOP, PieceType.QUEEN):
-                    return True
-                break
-        for offset_x, offset_y in KNIGHT_OFFSETS:
-            if not self.board.is_in_bound(x + offset_x, y + offset_y):
-                continue
-            selected_piece = self.board.get_piece(x + offset_x, y + offset_y)
-            if selected_piece is None or selected_piece.is_invis:
-                continue
-            if (
-                selected_piece.piece_type == PieceType.KNIGHT
-                and selected_piece.color != self.color
-            ):
-                return True
-        for offset_x in range(-1, 2):
-            for offset_y in range(-1, 2):
-                if offset_x == 0 and offset_y == 0:
-                    continue
-                if not self.board.is_in_bound(x + offset_x, y + offset_y):
-                    continue
-                selected_piece = self.board.get_piece(x + offset_x, y + offset_y)
-                if selected_piece is None or selected_piece.is_invis:
-                    continue
-                if (
-                    selected_piece.piece_type == PieceType.KING
-                    and selected_piece.color != self.color
-                ):
-                    return True
-        if self.color == PieceColor.WHITE:
-            pawn_direction = -1
-        elif self.color == PieceColor.BLACK:
-            pawn_direction = 1
-        for offset_x, offset_y in (
-            (-1, pawn_direction),
-            (+1, pawn_direction),
-        ):
-            if not self.board.is_in_bound(x + offset_x, y + offset_y):
-                continue
-            selected_piece = self.board.get_piece(x + offset_x, y + offset_y)
-            if selected_piece is None or selected_piece.is_invis:
-                continue
-            if (
-                selected_piece.piece_type == PieceType.PAWN
-                and selected_piece.color != self.color
-            ):
-                return True
-        return False
-
-    def is_pinned(self) -> bool:
-        self.is_invis = True
-        is_king_attacked = self.is_king_attacked()
-        self.is_invis = False
-        return is_king_attacked
-
-    def is_king_attacked(self) -> bool:
-        if self.color == PieceColor.WHITE:
-            king = self.board.white_king
-        elif self.color == PieceColor.BLACK:
-            king = self.board.black_king
-        if king is None:
-            raise Exception("How king dead")
-        return self.is_coord_attacked(king.pos_x, king.pos_y)
+        return bitboard.is_square_attacked(
+            self.board.bitboards,
+            bitboard.square(x, y),
+            self.color_index ^ 1,
+            self.board.occupied[0] | self.board.occupied[1],
+        )
 
 
 class PieceType(Enum):
@@ -360,3 +123,24 @@ class PieceType(Enum):
 class PieceColor(Enum):
     BLACK = auto()
     WHITE = auto()
+
+
+COLOR_INDEX = {PieceColor.WHITE: bitboard.WHITE, PieceColor.BLACK: bitboard.BLACK}
+TYPE_INDEX = {
+    PieceType.PAWN: bitboard.PAWN,
+    PieceType.KNIGHT: bitboard.KNIGHT,
+    PieceType.BISHOP: bitboard.BISHOP,
+    PieceType.ROOK: bitboard.ROOK,
+    PieceType.QUEEN: bitboard.QUEEN,
+    PieceType.KING: bitboard.KING,
+}
+# the other way around, indexed by bitboard color and piece type
+COLORS = (PieceColor.WHITE, PieceColor.BLACK)
+TYPES = (
+    PieceType.PAWN,
+    PieceType.KNIGHT,
+    PieceType.BISHOP,
+    PieceType.ROOK,
+    PieceType.QUEEN,
+    PieceType.KING,
+)
@@ -0,0 +1,124 @@
+import csv
+from collections import deque
+from time import perf_counter
+from typing import TextIO
+
+import pygame
+
+# what one pass through game.run spends its time on, in the order it happens
+FRAME_PHASES = (
+    "background",
+    "pieces",
+    "overlays",
+    "scene",  # the rest of on_loop, like polling the computer
+    "update",
+    "idle",  # waiting for events or for the next tick
+    "events",
+    "on_click",
+)
+NESTED_PHASES = ("movegen",)  # already counted in the phase it ran in
+HISTORY = 300  # frames the overlay computes its numbers from
+OVERLAY_FONT_SIZE = 24
+OVERLAY_PADDING = 6
+
+_active: "FrameProfiler | None" = None
+
+
+# marks are one perf_counter call each, so the loop can always keep them
+def lap(phase: str):
+    if _active is not None:
+        _active.lap(phase)
+
+
+def add(phase: str, seconds: float):
+    if _active is not None:
+        _active.times[phase] += seconds
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class FrameProfiler:
+    def __init__(self, csv_file: TextIO | None = None) -> None:
+        self.times = dict.fromkeys(FRAME_PHASES + NESTED_PHASES, 0.0)
+        self.frame_times: deque[float] = deque(maxlen=HISTORY)
+        self.work_times: deque[float] = deque(maxlen=HISTORY)  # without idle
+        self.last_movegen = 0.0
+        self.frame = 0
+        self.writer = None
+        if csv_file is not None:
+            self.writer = csv.writer(csv_file)
+            self.writer.writerow(
+                ["frame", "total_ms"] + [f"{phase}_ms" for phase in self.times]
+            )
+        self.font: pygame.font.Font | None = None
+        self.overlay_rect: pygame.Rect | None = None
+        self.mark = self.frame_start = perf_counter()
+
+    def start(self):
+        global _active
+        _active = self
+        self.mark = self.frame_start = perf_counter()
+
+    def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+
+    def lap(self, phase: str):
+        now = perf_counter()
+        self.times[phase] += now - self.mark
+        self.mark = now
+
+    def end_frame(self):
+        now = perf_counter()
+        total = now - self.frame_start
+        self.frame_times.append(total)
+        self.work_times.append(total - self.times["idle"])
+        if self.times["movegen"]:
+            self.last_movegen = self.times["movegen"]
+        if self.writer is not None:
+            self.writer.writerow(
+                [self.frame, f"{total * 1000:.3f}"]
+                + [f"{seconds * 1000:.3f}" for seconds in self.times.values()]
+            )
+        for phase in self.times:
+            self.times[phase] = 0.0
+        self.frame += 1
+        self.mark = self.frame_start = now
+
+    def get_lines(self) -> list[str]:
+        if not self.frame_times:
+            return ["no frames yet"]
+        work = list(self.work_times)
+        return [
+            f"FPS {len(self.frame_times) / sum(self.frame_times):5.1f}",
+            f"frame p50 {percentile(work, 0.5) * 1000:.1f} "
+            f"p95 {percentile(work, 0.95) * 1000:.1f} "
+            f"p99 {percentile(work, 0.99) * 1000:.1f} ms",
+            f"movegen {self.last_movegen * 1000:.1f} ms",
+        ]
+
+    def draw(self, screen: pygame.Surface) -> pygame.Rect:
+        if self.font is None:
+            self.font = pygame.font.Font(None, OVERLAY_FONT_SIZE)
+        texts = [
+            self.font.render(line, True, (255, 255, 255)) for line in self.get_lines()
+        ]
+        rect = pygame.Rect(
+            0,
+            0,
+            max(text.get_width() for text in texts) + OVERLAY_PADDING * 2,
+            sum(text.get_height() for text in texts) + OVERLAY_PADDING * 2,
+        )
+        if self.overlay_rect is not None:  # cover longer text from before
+            rect.union_ip(self.overlay_rect)
+        self.overlay_rect = rect
+        screen.fill((0, 0, 0), rect)
+        top = OVERLAY_PADDING
+        for text in texts:
+            screen.blit(text, (OVERLAY_PADDING, top))
+            top += text.get_height()
+        return rect
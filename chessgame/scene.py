@@ -1,18 +1,28 @@
+from math import ceil
+from time import perf_counter, strftime
 from typing import TYPE_CHECKING
 import pygame
 
 from abc import ABC, abstractmethod
 
-from chessgame import background
+from chessgame import background, bitboard, profiler
 from chessgame.board import Board, get_default_board
+from chessgame.book import open_book
 from chessgame.display import (
     PIECE_TYPE_COUNT,
     PROMOTION_PIECE_TYPES,
+    SpriteCache,
+    TextCache,
     get_image_dict,
+    render_piece,
     render_pieces,
     render_promotion,
 )
-from chessgame.piece import Piece, PieceColor
+from chessgame.engine import Engine, SearchResult, allocate_time
+from chessgame.pgn import PgnGame, game_from_board, write_game
+from chessgame.piece import COLOR_INDEX, Piece, PieceColor
+from chessgame.tablebase import open_tablebase
+from chessgame.worker import Worker, start_search
 
 BACKGROUND_COLOR = (247, 202, 201)  # Rose Quartz
 BLURRED_BLACK = (0, 0, 0, 192)
@@ -20,30 +30,82 @@ GAME_FONT = "Sans Serif"
 BUTTON_TEXT_SIZE = 50
 WINNER_SCENE_TEXT_SIZE = 150
 MENU_FONT = 70
+CLOCK_TEXT_SIZE = 40
 TIME_CONTROL = (5, 0)
+SMOOTH_PIECES = False  # smoothscale the pieces, nicer and slower on resize
+GAME_RESULTS = {PieceColor.WHITE: "1-0", PieceColor.BLACK: "0-1", None: "1/2-1/2"}
+
+# shared, scenes are created on every switch
+text_cache = TextCache(GAME_FONT)
+checkerboard = background.Checkerboard()
+_sprites: SpriteCache | None = None
+
+
+def get_sprites() -> SpriteCache:
+    # created on first use, the images can only be loaded once there is a window
+    global _sprites
+    if _sprites is None:
+        _sprites = SpriteCache(get_image_dict(), SMOOTH_PIECES)
+    return _sprites
 
 
 class Scene(ABC):
+    # after on_loop the game loop pushes dirty_rects to the window, None means
+    # the whole window and an empty list means nothing was drawn
+    dirty_rects: list[pygame.Rect] | None = None
+    drawn_size: tuple[int, int] | None = None
+
+    def needs_full_redraw(self, screen: pygame.Surface) -> bool:
+        if screen.get_size() == self.drawn_size:
+            return False
+        self.drawn_size = screen.get_size()
+        return True
+
+    def invalidate(self):
+        # the window lost its contents, draw everything on the next frame
+        self.drawn_size = None
+
+    def is_idle(self) -> bool:
+        # idle scenes only change on input, so the loop can sleep until some
+        return True
+
     @abstractmethod
     def on_click(self, delta_time: float) -> "Scene | None":
         pass
 
     @abstractmethod
-    def on_loop(self, screen: pygame.Surface, delta_time: float):
+    def on_loop(self, screen: pygame.Surface, delta_time: float) -> "Scene | None":
         pass
 
 
 class GameScene(Scene):
-    def __init__(self) -> None:
-        self.board = get_default_board()
-        self.images = get_image_dict()
+    def __init__(
+        self, board: Board | None = None, computer: PieceColor | None = None
+    ) -> None:
+        self.board = get_default_board() if board is None else board
+        self.sprites = get_sprites()
+        self.checkerboard = checkerboard
         self.piece: Piece | None = None
-        self.available_moves: list[tuple[int, int]] | None = None
-        self.turn = PieceColor.WHITE
-        self.white_time = 0
-        self.black_time = 0
+        self.available_moves: set[tuple[int, int]] | None = None
+        self.turn = self.board.turn
+        self.legal_moves = get_legal_move_map(self.board, self.turn)
+        self.white_time = TIME_CONTROL[0] * 60.0
+        self.black_time = TIME_CONTROL[0] * 60.0
+        self.computer = computer
+        self.engine = None
+        if computer is not None:
+            self.engine = Engine(book=open_book(), tablebase=open_tablebase())
+        self.worker: Worker[SearchResult] = Worker()
+        self.drawn_squares = bytes(64)
+        self.drawn_highlights = 0
+        self.drew_promotion = False
+        self.drawn_clocks: dict[PieceColor, str] = {}
+        self.clock_rects: dict[PieceColor, pygame.Rect] = {}
+        self.overlay: pygame.Surface | None = None
 
     def on_click(self, delta_time: float) -> "Scene | None":
+        if self.turn == self.computer:
+            return
         if self.board.promoted_piece is not None:
             pos_x, pos_y = pygame.mouse.get_pos()
             index_x = (
@@ -62,9 +124,8 @@ class GameScene(Scene):
             ) // self.pos_and_size[3]
             if index_x not in range(PIECE_TYPE_COUNT) and index_y != 0:
                 return
-            self.board.promoted_piece.piece_type = PROMOTION_PIECE_TYPES[int(index_x)]
-            self.board.promoted_piece = None
-            return
+            self.board.promote(PROMOTION_PIECE_TYPES[int(index_x)])
+            return self.end_turn()
 
         coord = get_coord_on_click(self.board, self.pos_and_size)
         if coord is None:
@@ -74,71 +135,231 @@ class GameScene(Scene):
             self.board.move_piece(
                 self.piece.pos_x, self.piece.pos_y, coord[0], coord[1]
             )
-            self.available_moves = None
-            self.piece = None
-            if self.turn == PieceColor.WHITE:
-                self.turn = PieceColor.BLACK
-            elif self.turn == PieceColor.BLACK:
-                self.turn = PieceColor.WHITE
-            if not can_continue(self.board, self.turn):
-                winner = get_winner(self.board, self.turn)
-                return GameOverScene(winner)
-            return
+            return self.after_move()
         self.piece = self.board.get_piece(coord[0], coord[1])
         if self.piece is None or self.piece.color != self.turn:
             self.piece = None
             self.available_moves = None
             return
-        self.available_moves = self.piece.available_moves()
+        self.available_moves = self.legal_moves.get(coord)
 
-    def on_loop(self, screen: pygame.Surface, delta_time: float):
-        screen.fill(BACKGROUND_COLOR)
-        self.pos_and_size = background.draw_checkers(screen, self.available_moves)
-        render_pieces(screen, self.board.tiles, self.pos_and_size, self.images)
+    def after_move(self) -> "Scene | None":
+        self.available_moves = None
+        self.piece = None
         if self.board.promoted_piece is not None:
-            black_scrn = pygame.Surface(
-                (screen.get_width(), screen.get_height()), pygame.SRCALPHA
+            return  # the turn and the clock wait until the promotion is picked
+        return self.end_turn()
+
+    def play_computer_move(self) -> "Scene | None":
+        assert self.engine is not None
+        if not self.worker.is_busy():
+            result = self.worker.poll()
+            if result is None:
+                if self.turn == PieceColor.WHITE:
+                    remaining = self.white_time
+                else:
+                    remaining = self.black_time
+                start_search(
+                    self.worker,
+                    self.engine,
+                    self.board,
+                    allocate_time(remaining, TIME_CONTROL[1]),
+                )
+                return
+            if result.move is not None:
+                self.board.make_move(result.move)
+                return self.after_move()
+
+    def end_turn(self) -> "Scene | None":
+        if self.turn == PieceColor.WHITE:
+            self.white_time += TIME_CONTROL[1]
+            self.turn = PieceColor.BLACK
+        elif self.turn == PieceColor.BLACK:
+            self.black_time += TIME_CONTROL[1]
+            self.turn = PieceColor.WHITE
+        start = perf_counter()
+        self.legal_moves = get_legal_move_map(self.board, self.turn)
+        profiler.add("movegen", perf_counter() - start)
+        if not self.legal_moves:
+            winner = get_winner(self.board, self.turn)
+            return GameOverScene(winner, self.to_pgn(winner))
+        if self.board.get_draw_reason() is not None:
+            return GameOverScene(None, self.to_pgn(None))
+
+    def flag_fall(self) -> "Scene":
+        # whoever ran out loses, unless the other side only has its king left
+        self.worker.cancel()
+        winner = PieceColor.BLACK if self.white_time <= 0 else PieceColor.WHITE
+        if self.board.occupied[COLOR_INDEX[winner]].bit_count() == 1:
+            winner = None
+        game = self.to_pgn(winner)
+        game.headers["Termination"] = "time forfeit"
+        return GameOverScene(winner, game)
+
+    def to_pgn(self, winner: PieceColor | None) -> PgnGame:
+        players = {PieceColor.WHITE: "Player", PieceColor.BLACK: "Player"}
+        if self.computer is not None:
+            players[self.computer] = "Computer"
+        headers = {
+            "Event": "Casual Game",
+            "Site": "chessgame",
+            "Date": strftime("%Y.%m.%d"),
+            "Round": "-",
+            "White": players[PieceColor.WHITE],
+            "Black": players[PieceColor.BLACK],
+        }
+        return game_from_board(self.board, headers, GAME_RESULTS[winner])
+
+    def is_idle(self) -> bool:
+        return self.turn != self.computer
+
+    def on_loop(self, screen: pygame.Surface, delta_time: float) -> "Scene | None":
+        if self.turn == PieceColor.WHITE:
+            self.white_time -= delta_time
+        else:
+            self.black_time -= delta_time
+        if min(self.white_time, self.black_time) <= 0:
+            return self.flag_fall()
+        promoting = self.board.promoted_piece is not None
+        full_redraw = self.needs_full_redraw(screen) or promoting != self.drew_promotion
+        self.drew_promotion = promoting
+        if full_redraw:
+            self.draw(screen)
+            self.dirty_rects = None
+        elif promoting:
+            # keep the clocks ticking under the dimmed overlay
+            self.dirty_rects = self.draw_clocks(screen)
+            assert self.overlay is not None
+            for rect in self.dirty_rects:
+                screen.blit(self.overlay, rect, rect)
+        else:
+            self.dirty_rects = self.draw_changed_squares(screen)
+            self.dirty_rects += self.draw_clocks(screen)
+        if not promoting and self.turn == self.computer:
+            return self.play_computer_move()
+
+    def draw_changed_squares(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        squares = bytes(self.board.squares)
+        highlights = get_square_mask(self.available_moves)
+        changed_highlights = highlights ^ self.drawn_highlights
+        if squares == self.drawn_squares and not changed_highlights:
+            return []
+        rects = []
+        for sq in range(64):
+            if (
+                squares[sq] == self.drawn_squares[sq]
+                and not changed_highlights >> sq & 1
+            ):
+                continue
+            y, x = divmod(sq, 8)
+            rects.append(
+                self.checkerboard.draw_square(screen, x, y, bool(highlights >> sq & 1))
             )
-            black_scrn.fill(BLURRED_BLACK)
-            screen.blit(black_scrn, (0, 0))
+            profiler.lap("background")
+            piece = self.board.tiles[y][x]
+            if piece is not None:
+                render_piece(screen, piece, self.pos_and_size, self.sprites)
+                profiler.lap("pieces")
+        self.drawn_squares = squares
+        self.drawn_highlights = highlights
+        return rects
+
+    def draw_clocks(self, screen: pygame.Surface) -> list[pygame.Rect]:
+        # the clocks only show whole seconds, so they are redrawn once a second
+        rects = []
+        left, top, _, tile_height = self.pos_and_size
+        width, height = screen.get_size()
+        bottom = top + tile_height * 8
+        for color, remaining, center in (
+            (PieceColor.BLACK, self.black_time, (left / 2, top + tile_height / 2)),
+            (PieceColor.WHITE, self.white_time, (left / 2, bottom - tile_height / 2)),
+        ):
+            if left < tile_height:  # a tall window, above and below the board
+                center = (
+                    width / 2,
+                    top / 2 if color == PieceColor.BLACK else (bottom + height) / 2,
+                )
+            seconds = max(ceil(remaining), 0)
+            text = f"{seconds // 60}:{seconds % 60:02d}"
+            if self.drawn_clocks.get(color) == text:
+                continue
+            surface = text_cache.render(text, CLOCK_TEXT_SIZE)
+            rect = surface.get_rect(center=center)
+            old_rect = self.clock_rects.get(color)
+            dirty = rect if old_rect is None else rect.union(old_rect)
+            screen.fill(BACKGROUND_COLOR, dirty)
+            screen.blit(surface, rect)
+            self.drawn_clocks[color] = text
+            self.clock_rects[color] = rect
+            rects.append(dirty)
+        return rects
+
+    def draw(self, screen: pygame.Surface):
+        screen.fill(BACKGROUND_COLOR)
+        self.pos_and_size = self.checkerboard.draw(screen, self.available_moves)
+        profiler.lap("background")
+        render_pieces(screen, self.board.tiles, self.pos_and_size, self.sprites)
+        profiler.lap("pieces")
+        self.drawn_squares = bytes(self.board.squares)
+        self.drawn_highlights = get_square_mask(self.available_moves)
+        self.drawn_clocks.clear()
+        self.clock_rects.clear()
+        self.draw_clocks(screen)
+        if self.board.promoted_piece is not None:
+            if self.overlay is None or self.overlay.get_size() != screen.get_size():
+                self.overlay = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+                self.overlay.fill(BLURRED_BLACK)
+            screen.blit(self.overlay, (0, 0))
             self.promotion_offset_x, self.promotion_offset_y = render_promotion(
-                screen, self.board.promoted_piece, self.pos_and_size, self.images
+                screen, self.board.promoted_piece, self.pos_and_size, self.sprites
             )
+            profiler.lap("overlays")
 
 
 class MenuScene(Scene):
-    def __init__(self) -> None:
-        self.menu_font = pygame.font.SysFont(GAME_FONT, MENU_FONT)
-        self.button_font = pygame.font.SysFont(GAME_FONT, BUTTON_TEXT_SIZE)
-
     def on_click(self, delta_time: float) -> "Scene | None":
         pos_x, pos_y = pygame.mouse.get_pos()
         if self.play_game_button_rect.collidepoint(pos_x, pos_y):
             return GameScene()
+        elif self.play_computer_button_rect.collidepoint(pos_x, pos_y):
+            return GameScene(computer=PieceColor.BLACK)
         elif self.settings_button_rect.collidepoint(pos_x, pos_y):
             return SettingScene()
 
-    def on_loop(self, screen: pygame.Surface, delta_time: float):
+    def on_loop(self, screen: pygame.Surface, delta_time: float) -> "Scene | None":
+        if not self.needs_full_redraw(screen):
+            self.dirty_rects = []
+            return
+        self.dirty_rects = None
         screen.fill(BACKGROUND_COLOR)
-        menu_title = self.menu_font.render("Goofy AHH Chessgame", True, (0, 0, 0))
+        menu_title = text_cache.render("Goofy AHH Chessgame", MENU_FONT)
         self.menu_text_rect = menu_title.get_rect(
             center=(screen.get_width() / 2, screen.get_height() / 8)
         )
         screen.blit(menu_title, self.menu_text_rect)
 
-        play_game_button = self.button_font.render("Play", True, (0, 0, 0))
+        play_game_button = text_cache.render("Play", BUTTON_TEXT_SIZE)
         self.play_game_button_rect = play_game_button.get_rect(
             center=(screen.get_width() / 2, screen.get_height() / 2)
         )
         screen.blit(play_game_button, self.play_game_button_rect)
 
-        settings_button = self.button_font.render("Settings", True, (0, 0, 0))
-        self.settings_button_rect = settings_button.get_rect(
+        play_computer_button = text_cache.render("Play vs Computer", BUTTON_TEXT_SIZE)
+        self.play_computer_button_rect = play_computer_button.get_rect(
             center=(
                 screen.get_width() / 2,
                 screen.get_height() / 2 + screen.get_height() / 8,
             )
         )
+        screen.blit(play_computer_button, self.play_computer_button_rect)
+
+        settings_button = text_cache.render("Settings", BUTTON_TEXT_SIZE)
+        self.settings_button_rect = settings_button.get_rect(
+            center=(
+                screen.get_width() / 2,
+                screen.get_height() / 2 + screen.get_height() / 4,
+            )
+        )
         screen.blit(settings_button, self.settings_button_rect)
 
 
@@ -147,24 +368,33 @@ class SettingScene(Scene):
     def on_click(self, delta_time: float) -> "Scene | None":
         pass
 
-    def on_loop(self, screen: pygame.Surface, delta_time: float):
+    def on_loop(self, screen: pygame.Surface, delta_time: float) -> "Scene | None":
         pass
 
 
 class GameOverScene(Scene):
-    def __init__(self, winner: PieceColor | None) -> None:
+    def __init__(self, winner: PieceColor | None, game: PgnGame | None = None) -> None:
         self.winner = winner
-        self.winner_font = pygame.font.SysFont(GAME_FONT, WINNER_SCENE_TEXT_SIZE)
-        self.button_font = pygame.font.SysFont(GAME_FONT, BUTTON_TEXT_SIZE)
+        self.game = game
+        self.saved_path: str | None = None
 
     def on_click(self, delta_time: float) -> "Scene | None":
         pos_x, pos_y = pygame.mouse.get_pos()
         if self.main_menu_button_rect.collidepoint(pos_x, pos_y):
             return MenuScene()
-
-    def on_loop(self, screen: pygame.Surface, delta_time: float):
+        elif self.game is not None and self.save_button_rect.collidepoint(pos_x, pos_y):
+            self.saved_path = f"game-{strftime('%Y%m%d-%H%M%S')}.pgn"
+            with open(self.saved_path, "w") as file:
+                write_game(file, self.game)
+            self.invalidate()
+
+    def on_loop(self, screen: pygame.Surface, delta_time: float) -> "Scene | None":
+        if not self.needs_full_redraw(screen):
+            self.dirty_rects = []
+            return
+        self.dirty_rects = None
         screen.fill(BACKGROUND_COLOR)
-        main_menu_button = self.button_font.render("To Main Menu", True, (0, 0, 0))
+        main_menu_button = text_cache.render("To Main Menu", BUTTON_TEXT_SIZE)
         self.main_menu_button_rect = main_menu_button.get_rect(
             center=(
                 screen.get_width() / 2,
@@ -172,6 +402,18 @@ class GameOverScene(Scene):
             )
         )
         screen.blit(main_menu_button, self.main_menu_button_rect)
+        if self.game is not None:
+            save_text = "Save Game"
+            if self.saved_path is not None:
+                save_text = f"Saved to {self.saved_path}"
+            save_button = text_cache.render(save_text, BUTTON_TEXT_SIZE)
+            self.save_button_rect = save_button.get_rect(
+                center=(
+                    screen.get_width() / 2,
+                    screen.get_height() / 2 + screen.get_height() * 3 / 8,
+                )
+            )
+            screen.blit(save_button, self.save_button_rect)
         end_text = ""
         if self.winner == PieceColor.BLACK:
             end_text = "BLACK WON!"
@@ -179,7 +421,7 @@ class GameOverScene(Scene):
             end_text = "WHITE WON!"
         else:
             end_text = "DRAW!"
-        winner_title = self.winner_font.render(end_text, True, (0, 0, 0))
+        winner_title = text_cache.render(end_text, WINNER_SCENE_TEXT_SIZE)
         winner_title_rect = winner_title.get_rect(
             center=(
                 screen.get_width() / 2,
@@ -193,6 +435,13 @@ class Pause(Scene):
     pass
 
 
+def get_square_mask(coords: set[tuple[int, int]] | None) -> int:
+    mask = 0
+    for x, y in coords or ():
+        mask |= 1 << (y * 8 + x)
+    return mask
+
+
 def get_coord_on_click(
     board: Board, pos_and_size: tuple[int, int, int, int]
 ) -> tuple[int, int] | None:
@@ -204,21 +453,18 @@ def get_coord_on_click(
     return index_x, index_y
 
 
-def can_continue(board: Board, turn: PieceColor) -> bool:
-    for piece in board.pieces_left:
-        if piece.color != turn:
-            continue
-        if piece.available_moves():
-            return True
-    return False
+def get_legal_move_map(
+    board: Board, turn: PieceColor
+) -> dict[tuple[int, int], set[tuple[int, int]]]:
+    legal_moves: dict[tuple[int, int], set[tuple[int, int]]] = {}
+    for from_sq, to, _ in board.legal_moves(turn):
+        coord = bitboard.coords(from_sq)
+        if coord not in legal_moves:
+            legal_moves[coord] = set()
+        legal_moves[coord].add(bitboard.coords(to))
+    return legal_moves
 
 
 def get_winner(board: Board, turn: PieceColor) -> PieceColor | None:
-    if turn == PieceColor.WHITE:
-        king = board.white_king
-        if king is not None and king.is_king_attacked():
-            return PieceColor.BLACK
-    elif turn == PieceColor.BLACK:
-        king = board.black_king
-        if king is not None and king.is_king_attacked():
-            return PieceColor.WHITE
+    if board.is_in_check(turn):
+        return PieceColor.BLACK if turn == PieceColor.WHITE else PieceColor.WHITE
@@ -0,0 +1,142 @@
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+from typing import Iterator, NamedTuple
+
+from .board import START_FEN, Board
+from .engine import MAX_DEPTH, Engine
+from .pgn import move_to_san
+from .piece import PieceColor
+from .tablebase import DRAW, open_tablebase
+
+MAX_PLIES = 400
+
+_engine: Engine | None = None
+
+
+class PlayerSpec(NamedTuple):
+    name: str
+    depth: int | None  # None picks random legal moves
+    time_limit: float | None
+
+
+def parse_player(text: str) -> PlayerSpec:
+    if text == "random":
+        return PlayerSpec(text, None, None)
+    kind, _, value = text.partition("=")
+    if kind == "depth":
+        return PlayerSpec(text, int(value), None)
+    if kind == "time":
+        return PlayerSpec(text, MAX_DEPTH, float(value))
+    raise ValueError(f"unknown player {text}, use random, depth=N or time=SECONDS")
+
+
+class GameTask(NamedTuple):
+    index: int
+    white: PlayerSpec
+    black: PlayerSpec
+    seed: int
+    fen: str = START_FEN
+    max_plies: int = MAX_PLIES
+
+
+class GameRecord(NamedTuple):
+    index: int
+    white: str
+    black: str
+    result: str
+    termination: str
+    moves: list[str]  # SAN
+    nodes: tuple[int, int]  # searched by white, black
+    seconds: float
+    worker: int  # process id
+
+    def to_json(self) -> str:
+        return json.dumps(self._asdict())
+
+
+def _init_worker(tt_megabytes: float):
+    global _engine
+    _engine = Engine(tt_megabytes, tablebase=open_tablebase())
+
+
+def play_game(task: GameTask) -> GameRecord:
+    global _engine
+    if _engine is None:
+        _engine = Engine(tablebase=open_tablebase())
+    engine = _engine
+    engine.tt.clear()  # games should not depend on what the process played before
+    rng = random.Random(task.seed)
+    board = Board.from_fen(task.fen)
+    moves: list[str] = []
+    nodes = [0, 0]
+    result = "1/2-1/2"
+    termination = "max plies"
+    start = perf_counter()
+    while True:
+        legal_moves = board.legal_moves()
+        if not legal_moves:
+            if board.is_in_check():
+                result = "0-1" if board.turn == PieceColor.WHITE else "1-0"
+                termination = "checkmate"
+            else:
+                termination = "stalemate"
+            break
+        draw_reason = board.get_draw_reason()
+        if draw_reason is not None:
+            termination = draw_reason
+            break
+        if engine.tablebase is not None:
+            value = engine.tablebase.probe(board)
+            if value is not None:  # perfect play decides it from here
+                if value != DRAW:
+                    side_to_move_wins = value > 0
+                    white_wins = side_to_move_wins == (board.turn == PieceColor.WHITE)
+                    result = "1-0" if white_wins else "0-1"
+                termination = "tablebase"
+                break
+        if len(moves) >= task.max_plies:
+            result = "*"  # unfinished, not a draw
+            break
+
+        player = task.white if board.turn == PieceColor.WHITE else task.black
+        if player.depth is None:
+            move = rng.choice(legal_moves)
+        else:
+            search = engine.search(board, player.depth, player.time_limit)
+            assert search.move is not None
+            move = search.move
+            nodes[board.side] += search.nodes
+        moves.append(move_to_san(board, move))
+        board.make_move(move)
+
+    return GameRecord(
+        task.index,
+        task.white.name,
+        task.black.name,
+        result,
+        termination,
+        moves,
+        (nodes[0], nodes[1]),
+        perf_counter() - start,
+        os.getpid(),
+    )
+
+
+def run_games(
+    tasks: list[GameTask], workers: int | None = None, tt_megabytes: float = 16
+) -> Iterator[GameRecord]:
+    # records come back as games finish, not in task order
+    pool = ProcessPoolExecutor(
+        workers or os.cpu_count() or 1,
+        initializer=_init_worker,
+        initargs=(tt_megabytes,),
+    )
+    try:
+        futures = [pool.submit(play_game, task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        pool.shutdown(cancel_futures=True)
@@ -0,0 +1,335 @@
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from time import perf_counter
+from typing import NamedTuple
+
+from . import bitboard
+from .board import Board
+
+# the strong side's extra piece, in the order they are generated since pawns
+# promote into the others
+TABLES = {"KQK": bitboard.QUEEN, "KRK": bitboard.ROOK, "KPK": bitboard.PAWN}
+DEFAULT_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "assets", "tablebases"
+)
+MAGIC = b"CGTB1\n"
+
+# indexed by strong king, strong side to move or not, weak king, piece square,
+# always with the strong side as white, black is mirrored onto it
+CHUNK_SIZE = 2 * 64 * 64
+POSITIONS = 64 * CHUNK_SIZE
+
+# one signed byte per position, for the side to move: wins in n plies are n
+# (always odd), losses in n plies are -n - 1 (n is even, so -1 is mated)
+ILLEGAL = -128
+DRAW = 0
+MAX_PLIES = 126
+UNKNOWN = 0x7FFF  # only while generating
+
+_promotion_tables: dict[int, array] = {}
+
+
+def get_index(
+    strong_king: int, strong_to_move: bool, weak_king: int, piece: int
+) -> int:
+    return ((strong_king * 2 + (not strong_to_move)) * 64 + weak_king) * 64 + piece
+
+
+def get_plies(value: int) -> int:
+    return value if value > 0 else -value - 1
+
+
+def encode_plies(plies: int) -> int:
+    return plies if plies % 2 else -plies - 1
+
+
+class ChunkMoves(NamedTuple):
+    # every position with one strong king square, from one worker
+    values: array  # UNKNOWN, ILLEGAL, DRAW for stalemate or -1 for mate
+    counts: array  # moves staying in the table, per position
+    successors: array  # their indexes, flattened
+    exits: list[tuple[int, int]]  # (index, value for whoever moves next)
+
+
+class TableStats(NamedTuple):
+    name: str
+    positions: int
+    wins: int
+    draws: int
+    losses: int
+    longest_mate: int  # plies
+    seconds: float
+
+    @property
+    def positions_per_second(self) -> float:
+        return self.positions / self.seconds if self.seconds > 0 else 0.0
+
+
+def _init_worker(promotion_tables: dict[int, array]):
+    global _promotion_tables
+    _promotion_tables = promotion_tables
+
+
+def _is_placement_valid(
+    piece_type: int, strong_king: int, weak_king: int, piece: int
+) -> bool:
+    if len({strong_king, weak_king, piece}) < 3:
+        return False
+    if bitboard.KING_ATTACKS[strong_king] & (1 << weak_king):
+        return False
+    return piece_type != bitboard.PAWN or 0 < piece >> 3 < 7
+
+
+def _generate_chunk(piece_type: int, strong_king: int) -> ChunkMoves:
+    # walks every position with the game's own move generator and records
+    # where each move leads, the solving happens once all chunks are in
+    board = Board()
+    bitboards = board.bitboards
+    occupied = board.occupied
+    weak_king_index = bitboard.PIECE_TYPES_COUNT + bitboard.KING
+    values = array("h", [UNKNOWN]) * CHUNK_SIZE
+    counts = array("B", bytes(CHUNK_SIZE))
+    successors = array("l")
+    exits = []
+    first = strong_king * CHUNK_SIZE
+    bitboards[bitboard.KING] = 1 << strong_king
+    for strong_to_move in (True, False):
+        color = bitboard.WHITE if strong_to_move else bitboard.BLACK
+        for weak_king in range(64):
+            bitboards[weak_king_index] = 1 << weak_king
+            occupied[bitboard.BLACK] = 1 << weak_king
+            own_king, other_king = strong_king, weak_king
+            if not strong_to_move:
+                own_king, other_king = weak_king, strong_king
+            for piece in range(64):
+                index = get_index(strong_king, strong_to_move, weak_king, piece)
+                local = index - first
+                if not _is_placement_valid(piece_type, strong_king, weak_king, piece):
+                    values[local] = ILLEGAL
+                    continue
+                bitboards[piece_type] = 1 << piece
+                occupied[bitboard.WHITE] = 1 << strong_king | 1 << piece
+                everything = occupied[0] | occupied[1]
+                if bitboard.is_square_attacked(
+                    bitboards, other_king, color, everything
+                ):
+                    values[local] = ILLEGAL  # the side that just moved is in check
+                    continue
+                moves = bitboard.generate_legal_moves(board, color)
+                if not moves:
+                    in_check = bitboard.is_square_attacked(
+                        bitboards, own_king, color ^ 1, everything
+                    )
+                    values[local] = encode_plies(0) if in_check else DRAW
+                    continue
+                for from_sq, to, promotion in moves:
+                    if not strong_to_move:
+                        if to == piece:  # the last piece is gone
+                            exits.append((index, DRAW))
+                            continue
+                        successor = get_index(strong_king, True, to, piece)
+                    elif from_sq == strong_king:
+                        successor = get_index(to, False, weak_king, piece)
+                    elif promotion is None:
+                        successor = get_index(strong_king, False, weak_king, to)
+                    else:
+                        table = _promotion_tables.get(promotion)
+                        value = DRAW  # a lone minor piece cannot mate
+                        if table is not None:
+                            value = table[get_index(strong_king, False, weak_king, to)]
+                        exits.append((index, value))
+                        continue
+                    successors.append(successor)
+                    counts[local] += 1
+    return ChunkMoves(values, counts, successors, exits)
+
+
+def _solve(chunks: list[ChunkMoves]) -> array:
+    values = array("h")
+    counts = array("B")
+    for chunk in chunks:
+        values.extend(chunk.values)
+        counts.extend(chunk.counts)
+
+    # predecessors in one flat array, the moves into position i are at
+    # predecessors[starts[i]:starts[i + 1]]
+    starts = array("l", [0]) * (POSITIONS + 1)
+    for chunk in chunks:
+        for successor in chunk.successors:
+            starts[successor + 1] += 1
+    for index in range(POSITIONS):
+        starts[index + 1] += starts[index]
+    filled = array("l", starts)
+    predecessors = array("l", [0]) * starts[POSITIONS]
+    index = 0
+    for chunk in chunks:
+        position = 0
+        for successor in chunk.successors:
+            while not chunk.counts[position]:
+                position += 1
+            predecessors[filled[successor]] = index + position
+            filled[successor] += 1
+            chunk.counts[position] -= 1
+        index += CHUNK_SIZE
+
+    # retrograde: positions are settled in order of plies to mate, a loss in n
+    # makes its predecessors wins in n + 1, a position whose every move is a
+    # win for the other side is lost one ply after the slowest of them
+    remaining = counts
+    loss_plies = array("B", bytes(POSITIONS))
+    buckets: list[list[int]] = [[] for _ in range(MAX_PLIES + 2)]
+    for position in range(POSITIONS):
+        if values[position] == encode_plies(0):
+            values[position] = UNKNOWN
+            buckets[0].append(position)
+    for chunk in chunks:
+        for position, value in chunk.exits:
+            remaining[position] += 1
+    for chunk in chunks:
+        for position, value in chunk.exits:
+            if value == DRAW:
+                continue
+            plies = get_plies(value) + 1
+            if value < 0:
+                buckets[plies].append(position)
+            else:
+                remaining[position] -= 1
+                loss_plies[position] = max(loss_plies[position], plies)
+                if not remaining[position]:
+                    buckets[loss_plies[position]].append(position)
+
+    for plies in range(MAX_PLIES + 1):
+        for position in buckets[plies]:
+            if values[position] != UNKNOWN:
+                continue
+            values[position] = encode_plies(plies)
+            for index in range(starts[position], starts[position + 1]):
+                predecessor = predecessors[index]
+                if values[predecessor] != UNKNOWN:
+                    continue
+                if plies % 2 == 0:
+                    buckets[plies + 1].append(predecessor)
+                else:
+                    remaining[predecessor] -= 1
+                    if not remaining[predecessor]:
+                        lost_in = max(loss_plies[predecessor], plies + 1)
+                        buckets[lost_in].append(predecessor)
+    if buckets[MAX_PLIES + 1]:
+        raise ValueError(f"mates longer than {MAX_PLIES} plies do not fit")
+
+    table = array("b", bytes(POSITIONS))
+    for position, value in enumerate(values):
+        table[position] = DRAW if value == UNKNOWN else value
+    return table
+
+
+def get_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.tb")
+
+
+def load_table(path: str) -> array:
+    with open(path, "rb") as file:
+        data = file.read()
+    if data[: len(MAGIC)] != MAGIC or len(data) != len(MAGIC) + POSITIONS:
+        raise ValueError(f"{path} is not a tablebase")
+    table = array("b")
+    table.frombytes(data[len(MAGIC) :])
+    return table
+
+
+def generate_table(
+    name: str, directory: str = DEFAULT_DIRECTORY, workers: int | None = None
+) -> TableStats:
+    start = perf_counter()
+    piece_type = TABLES[name]
+    promotion_tables = {}
+    if piece_type == bitboard.PAWN:
+        for other_name, other_type in TABLES.items():
+            if other_type != bitboard.PAWN:
+                promotion_tables[other_type] = load_table(
+                    get_path(directory, other_name)
+                )
+    with ProcessPoolExecutor(
+        workers or os.cpu_count() or 1,
+        initializer=_init_worker,
+        initargs=(promotion_tables,),
+    ) as pool:
+        chunks = list(pool.map(_generate_chunk, repeat(piece_type), range(64)))
+    table = _solve(chunks)
+
+    os.makedirs(directory, exist_ok=True)
+    with open(get_path(directory, name), "wb") as file:
+        file.write(MAGIC)
+        table.tofile(file)
+    legal = [value for value in table if value != ILLEGAL]
+    return TableStats(
+        name,
+        len(legal),
+        sum(1 for value in legal if value > 0),
+        legal.count(DRAW),
+        sum(1 for value in legal if value < 0),
+        max(get_plies(value) for value in legal if value != DRAW),
+        perf_counter() - start,
+    )
+
+
+class Tablebase:
+    def __init__(self, directory: str = DEFAULT_DIRECTORY) -> None:
+        self.tables: dict[int, array] = {}
+        for name, piece_type in TABLES.items():
+            path = get_path(directory, name)
+            if os.path.exists(path):
+                self.tables[piece_type] = load_table(path)
+
+    def probe(self, board: Board) -> int | None:
+        # the table value for the side to move, None when no table applies
+        occupied = board.occupied
+        if (occupied[0] | occupied[1]).bit_count() != 3 or board.castling_rights:
+            return None
+        strong = bitboard.WHITE if occupied[0].bit_count() == 2 else bitboard.BLACK
+        base = strong * bitboard.PIECE_TYPES_COUNT
+        for piece_type, table in self.tables.items():
+            piece = board.bitboards[base + piece_type]
+            if piece:
+                break
+        else:
+            return None
+        weak_base = (strong ^ 1) * bitboard.PIECE_TYPES_COUNT
+        flip = 56 if strong == bitboard.BLACK else 0
+        return table[
+            get_index(
+                (board.bitboards[base + bitboard.KING].bit_length() - 1) ^ flip,
+                board.side == strong,
+                (board.bitboards[weak_base + bitboard.KING].bit_length() - 1) ^ flip,
+                (piece.bit_length() - 1) ^ flip,
+            )
+        ]
+
+    def get_best_move(self, board: Board) -> bitboard.Move | None:
+        # fastest win, else a draw, else the slowest loss
+        best_move = None
+        best_rank = None
+        for move in board.legal_moves():
+            board.make_move(move)
+            value = self.probe(board)
+            if value is None and board.is_insufficient_material():
+                value = DRAW
+            board.unmake_move()
+            if value is None:
+                return None
+            if value < 0:
+                rank = (2, -get_plies(value))
+            elif value == DRAW:
+                rank = (1, 0)
+            else:
+                rank = (0, get_plies(value))
+            if best_rank is None or rank > best_rank:
+                best_move, best_rank = move, rank
+        return best_move
+
+
+def open_tablebase(directory: str = DEFAULT_DIRECTORY) -> Tablebase | None:
+    tablebase = Tablebase(directory)
+    return tablebase if tablebase.tables else None
@@ -0,0 +1,111 @@
+from array import array
+from typing import NamedTuple
+
+from . import bitboard
+
+EMPTY = 0
+EXACT = 1
+LOWER_BOUND = 2
+UPPER_BOUND = 3
+
+# keys, scores, packed moves, depths, flags and generations
+ENTRY_SIZE = 8 + 4 + 2 + 1 + 1 + 1
+NO_MOVE = 0xFFFF
+
+
+class TTEntry(NamedTuple):
+    depth: int
+    score: int
+    flag: int
+    move: bitboard.Move | None
+
+
+def pack_move(move: bitboard.Move | None) -> int:
+    if move is None:
+        return NO_MOVE
+    from_sq, to, promotion = move
+    return from_sq | to << 6 | (0 if promotion is None else promotion + 1) << 12
+
+
+def unpack_move(packed: int) -> bitboard.Move | None:
+    if packed == NO_MOVE:
+        return None
+    promotion = packed >> 12
+    return packed & 63, packed >> 6 & 63, None if promotion == 0 else promotion - 1
+
+
+class TranspositionTable:
+    def __init__(self, megabytes: float = 16) -> None:
+        size = 1
+        while size * 2 * ENTRY_SIZE <= megabytes * 1024 * 1024:
+            size *= 2
+        self.size = size
+        self.mask = size - 1
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        size = self.size
+        self.keys = array("Q", bytes(8 * size))
+        self.scores = array("i", bytes(4 * size))
+        self.moves = array("H", [NO_MOVE]) * size
+        self.depths = array("b", bytes(size))
+        self.flags = array("B", bytes(size))
+        self.generations = array("B", bytes(size))
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def new_search(self):
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key: int) -> TTEntry | None:
+        index = key & self.mask
+        if self.flags[index] == EMPTY or self.keys[index] != key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return TTEntry(
+            self.depths[index],
+            self.scores[index],
+            self.flags[index],
+            unpack_move(self.moves[index]),
+        )
+
+    def store(
+        self, key: int, depth: int, score: int, flag: int, move: bitboard.Move | None
+    ):
+        index = key & self.mask
+        if self.flags[index] != EMPTY:
+            same_position = self.keys[index] == key
+            # keep deeper results from the current search unless they are stale
+            if (
+                not same_position
+                and self.generations[index] == self.generation
+                and self.depths[index] > depth
+            ):
+                return
+            if same_position and move is None:
+                move = unpack_move(self.moves[index])
+            if not same_position:
+                self.overwrites += 1
+        self.keys[index] = key
+        self.scores[index] = score
+        self.moves[index] = pack_move(move)
+        self.depths[index] = depth
+        self.flags[index] = flag
+        self.generations[index] = self.generation
+        self.stores += 1
+
+    def hashfull(self) -> int:
+        sample = min(self.size, 1000)
+        used = sum(
+            1
+            for index in range(sample)
+            if self.flags[index] != EMPTY and self.generations[index] == self.generation
+        )
+        return used * 1000 // sample
+
+    def memory_usage(self) -> int:
+        return self.size * ENTRY_SIZE
@@ -0,0 +1,80 @@
+from threading import Thread
+from typing import Callable, Generic, TypeVar
+
+from .board import Board
+from .engine import MAX_DEPTH, Engine, SearchResult
+
+T = TypeVar("T")
+
+CANCEL_POLL_INTERVAL = 0.01
+
+
+# runs one job at a time on a daemon thread so the game loop never waits on it,
+# the job gets the worker to report() partial results through
+class Worker(Generic[T]):
+    def __init__(self) -> None:
+        self.progress: object | None = None
+        self._thread: Thread | None = None
+        self._result: T | None = None
+        self._error: BaseException | None = None
+        self._stop: Callable[[], None] | None = None
+
+    def submit(
+        self,
+        job: Callable[["Worker[T]"], T],
+        stop: Callable[[], None] | None = None,
+    ):
+        if self.is_busy():
+            raise RuntimeError("the worker is already running a job")
+        self.progress = None
+        self._result = None
+        self._error = None
+        self._stop = stop
+        self._thread = Thread(target=self._run, args=(job,), daemon=True)
+        self._thread.start()
+
+    def report(self, progress: object):
+        self.progress = progress
+
+    def is_busy(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def poll(self) -> T | None:
+        if self._thread is None or self._thread.is_alive():
+            return None
+        self._thread = None
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def cancel(self):
+        thread = self._thread
+        if thread is None:
+            return
+        # keep asking in case the job had not started listening yet
+        while thread.is_alive():
+            if self._stop is not None:
+                self._stop()
+            thread.join(CANCEL_POLL_INTERVAL)
+        self._thread = None
+
+    def _run(self, job: Callable[["Worker[T]"], T]):
+        try:
+            self._result = job(self)
+        except BaseException as error:
+            self._error = error
+
+
+def start_search(
+    worker: Worker[SearchResult],
+    engine: Engine,
+    board: Board,
+    time_limit: float | None = None,
+    max_depth: int = MAX_DEPTH,
+):
+    # the engine walks its own copy while the window keeps drawing the real board
+    position = board.copy()
+    worker.submit(
+        lambda worker: engine.search(position, max_depth, time_limit, worker.report),
+        engine.stop,
+    )
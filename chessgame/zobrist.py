@@ -0,0 +1,30 @@
+from random import Random
+from typing import TYPE_CHECKING
+
+from . import bitboard
+
+if TYPE_CHECKING:
+    from .board import Board
+
+_random = Random(0x5EED)
+
+PIECE_KEYS = tuple(
+    tuple(_random.getrandbits(64) for _ in range(64))
+    for _ in range(2 * bitboard.PIECE_TYPES_COUNT)
+)
+CASTLING_KEYS = (0, *(_random.getrandbits(64) for _ in range(15)))
+EP_KEYS = tuple(_random.getrandbits(64) for _ in range(8))  # per file
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)
+
+
+def compute_hash(board: "Board") -> int:
+    key = 0
+    for index, pieces in enumerate(board.bitboards):
+        for sq in bitboard.iter_squares(pieces):
+            key ^= PIECE_KEYS[index][sq]
+    key ^= CASTLING_KEYS[board.castling_rights]
+    if board.ep_square is not None:
+        key ^= EP_KEYS[board.ep_square & 7]
+    if board.side == bitboard.BLACK:
+        key ^= BLACK_TO_MOVE_KEY
+    return key
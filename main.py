@@ -1,9 +1,32 @@
-import chessgame
+import argparse
+
+from chessgame import display, game
+from chessgame.board import Board
+from chessgame.profiler import FrameProfiler
+from chessgame.scene import GameScene
 
 
 def main():
-    mainscreen = chessgame.display.initialize()
-    chessgame.game.run(mainscreen)
+    parser = argparse.ArgumentParser(description="play chess")
+    parser.add_argument("--fen", help="skip the menu and play from this position")
+    parser.add_argument(
+        "--overlay", action="store_true", help="start with the F3 frame stats shown"
+    )
+    parser.add_argument("--profile-csv", help="write the time of every frame here")
+    parser.add_argument(
+        "--frames", type=int, help="quit after this many frames, without idling"
+    )
+    args = parser.parse_args()
+    board = None if args.fen is None else Board.from_fen(args.fen)
+
+    mainscreen = display.initialize()
+    scene = None if board is None else GameScene(board)
+    if args.profile_csv is None:
+        game.run(mainscreen, scene, None, args.overlay, args.frames)
+        return
+    with open(args.profile_csv, "w", newline="") as csv_file:
+        frame_profiler = FrameProfiler(csv_file)
+        game.run(mainscreen, scene, frame_profiler, args.overlay, args.frames)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,55 @@
+import argparse
+import sys
+from time import perf_counter
+
+from chessgame.board import START_FEN, Board
+from chessgame.perft import POSITIONS, divide, move_name, perft, run_suite, verify
+
+
+def main():
+    parser = argparse.ArgumentParser(description="count move generation leaf nodes")
+    parser.add_argument("depth", type=int, nargs="?", default=3)
+    parser.add_argument("--fen", default=START_FEN)
+    parser.add_argument("--divide", action="store_true", help="print nodes per move")
+    parser.add_argument(
+        "--suite", action="store_true", help="run every known position up to depth"
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="check the incremental state against a recount at every node",
+    )
+    args = parser.parse_args()
+
+    if args.suite:
+        failed = False
+        for result in run_suite(args.depth, args.verify):
+            status = "ok" if result.passed else f"FAIL expected {result.expected}"
+            print(
+                f"{result.name:<20} depth {result.depth} {result.nodes:>10} nodes "
+                f"{result.seconds:8.2f}s {result.nodes_per_second:10.0f} nps {status}"
+            )
+            failed |= not result.passed
+        sys.exit(1 if failed else 0)
+
+    board = Board.from_fen(args.fen)
+    start = perf_counter()
+    if args.divide:
+        nodes = 0
+        for move, count in divide(board, args.depth):
+            print(f"{move_name(move)}: {count}")
+            nodes += count
+    elif args.verify:
+        nodes = verify(board, args.depth)
+    else:
+        nodes = perft(board, args.depth)
+    seconds = perf_counter() - start
+    print(f"nodes {nodes} time {seconds:.2f}s nps {nodes / max(seconds, 1e-9):.0f}")
+    for position in POSITIONS:
+        if position.fen == args.fen and args.depth <= len(position.nodes):
+            expected = position.nodes[args.depth - 1]
+            print(f"expected {expected} {'ok' if expected == nodes else 'FAIL'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+
+from chessgame.board import START_FEN, Board
+from chessgame.book import OpeningBook
+from chessgame.engine import Engine, SearchResult
+from chessgame.parallel import ParallelEngine
+from chessgame.perft import move_name
+from chessgame.tablebase import open_tablebase
+
+
+def print_iteration(result: SearchResult):
+    print(
+        f"depth {result.depth:>2} score {result.score:>6} nodes {result.nodes:>9} "
+        f"time {result.seconds:7.2f}s nps {result.nodes_per_second:8.0f} "
+        f"pv {' '.join(move_name(move) for move in result.pv)}"
+    )
+
+
+def run_scaling(fen: str, depth: int, max_workers: int, tt_megabytes: float):
+    base_seconds = None
+    for workers in range(1, max_workers + 1):
+        with ParallelEngine(workers, tt_megabytes) as engine:
+            engine.search(Board.from_fen(fen), 1)  # start the processes
+            result = engine.search(Board.from_fen(fen), depth)
+        if base_seconds is None:
+            base_seconds = result.seconds
+        print(
+            f"workers {workers:>2} depth {result.depth} nodes {result.nodes:>9} "
+            f"time {result.seconds:7.2f}s nps {result.nodes_per_second:8.0f} "
+            f"speedup {base_seconds / result.seconds:5.2f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="search a position without a window")
+    parser.add_argument("--fen", default=START_FEN)
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--time", type=float, default=None, help="seconds to think")
+    parser.add_argument("--hash", type=float, default=16, help="table size in MB")
+    parser.add_argument(
+        "--workers", type=int, default=0, help="search with this many processes"
+    )
+    parser.add_argument("--book", help="play from this opening book when it knows")
+    parser.add_argument(
+        "--tablebase", help="directory of endgame tables to play and search with"
+    )
+    parser.add_argument(
+        "--scaling",
+        action="store_true",
+        help="time the search to depth with 1 up to --workers processes",
+    )
+    args = parser.parse_args()
+
+    if args.scaling:
+        run_scaling(args.fen, args.depth, max(args.workers, 1), args.hash)
+        return
+
+    board = Board.from_fen(args.fen)
+    if args.workers:
+        with ParallelEngine(args.workers, args.hash) as parallel_engine:
+            result = parallel_engine.search(board, args.depth, args.time)
+        print_iteration(result)
+        best = "none" if result.move is None else move_name(result.move)
+        print(f"bestmove {best}")
+        return
+
+    engine = Engine(
+        args.hash,
+        None if args.book is None else OpeningBook(args.book),
+        None if args.tablebase is None else open_tablebase(args.tablebase),
+    )
+    result = engine.search(board, args.depth, args.time, print_iteration)
+    best = "none" if result.move is None else move_name(result.move)
+    print(f"bestmove {best}")
+    tt = engine.tt
+    print(
+        f"tt hits {tt.hits} misses {tt.misses} "
+        f"stores {tt.stores} overwrites {tt.overwrites} "
+        f"full {tt.hashfull()}/1000 of {tt.memory_usage() / 1e6:.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
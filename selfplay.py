@@ -0,0 +1,69 @@
+import argparse
+import os
+from collections import Counter
+from time import perf_counter
+
+from chessgame.board import START_FEN
+from chessgame.selfplay import GameTask, parse_player, run_games
+
+
+def main():
+    parser = argparse.ArgumentParser(description="play games without a window")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--white",
+        type=parse_player,
+        default="depth=2",
+        help="random, depth=N or time=SECONDS",
+    )
+    parser.add_argument("--black", type=parse_player, default="random")
+    parser.add_argument(
+        "--alternate", action="store_true", help="swap colors every other game"
+    )
+    parser.add_argument("--fen", default=START_FEN)
+    parser.add_argument("--max-plies", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hash", type=float, default=16, help="table size in MB")
+    parser.add_argument("--output", default="selfplay.jsonl")
+    args = parser.parse_args()
+
+    tasks = []
+    for index in range(args.games):
+        white, black = args.white, args.black
+        if args.alternate and index % 2:
+            white, black = black, white
+        tasks.append(
+            GameTask(index, white, black, args.seed + index, args.fen, args.max_plies)
+        )
+
+    results: Counter[str] = Counter()
+    busy: Counter[int] = Counter()
+    plies = 0
+    start = perf_counter()
+    with open(args.output, "w") as output:
+        for record in run_games(tasks, args.workers, args.hash):
+            output.write(record.to_json() + "\n")
+            output.flush()
+            results[f"{record.white} vs {record.black} {record.result}"] += 1
+            busy[record.worker] += record.seconds
+            plies += len(record.moves)
+            print(
+                f"game {record.index:>5} {record.result:<7} {record.termination:<21} "
+                f"{len(record.moves):>3} plies {record.seconds:6.2f}s"
+            )
+    seconds = perf_counter() - start
+
+    print()
+    for outcome, count in sorted(results.items()):
+        print(f"{outcome}: {count}")
+    print(
+        f"{args.games} games in {seconds:.1f}s: {args.games / seconds * 3600:.0f} "
+        f"games/hour {plies / seconds:.0f} plies/s"
+    )
+    for number, (worker, busy_seconds) in enumerate(sorted(busy.items()), 1):
+        print(f"worker {number} (pid {worker}) busy {busy_seconds / seconds:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+from time import perf_counter
+
+from chessgame import pgn
+from chessgame.board import Board
+from chessgame.tablebase import (
+    DEFAULT_DIRECTORY,
+    DRAW,
+    TABLES,
+    Tablebase,
+    generate_table,
+    get_plies,
+)
+
+
+def run_generate(names: list[str], directory: str, workers: int | None):
+    # pawn endings promote into the other tables, so those go first
+    for name in sorted(names, key=list(TABLES).index):
+        stats = generate_table(name, directory, workers)
+        print(
+            f"{stats.name} {stats.positions} positions "
+            f"{stats.wins} wins {stats.draws} draws {stats.losses} losses, "
+            f"longest mate {stats.longest_mate} plies, {stats.seconds:.1f}s "
+            f"{stats.positions_per_second:.0f} positions/s"
+        )
+
+
+def run_probe(directory: str, fen: str, repeat: int):
+    tablebase = Tablebase(directory)
+    board = Board.from_fen(fen)
+    start = perf_counter()
+    for _ in range(repeat):
+        value = tablebase.probe(board)
+    lookup = (perf_counter() - start) / repeat
+    if value is None:
+        print("no table for this position")
+        return
+    outcome = "draw"
+    if value != DRAW:
+        outcome = f"{'win' if value > 0 else 'loss'} in {get_plies(value)} plies"
+    move = tablebase.get_best_move(board)
+    best = "none" if move is None else pgn.move_to_san(board, move)
+    print(f"{outcome} for the side to move, best {best}, lookup {lookup * 1e6:.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="make or read endgame tablebases")
+    parser.add_argument(
+        "--tables", nargs="+", choices=list(TABLES), default=list(TABLES)
+    )
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY)
+    parser.add_argument(
+        "--workers", type=int, help="generating processes, all cores by default"
+    )
+    parser.add_argument("--probe", metavar="FEN", help="look up a position instead")
+    parser.add_argument("--repeat", type=int, default=10000)
+    args = parser.parse_args()
+
+    if args.probe is not None:
+        run_probe(args.directory, args.probe, args.repeat)
+    else:
+        run_generate(args.tables, args.directory, args.workers)
+
+
+if __name__ == "__main__":
+    main()